@@ -1,32 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List, Dict
 
-from app.models.models import QuarantineLog
+from app.models.models import QuarantineLog, WaferSummary
 from app.schemas.schemas import (
     TelemetryData,
     MetricType,
     PredictionResponse,
     RootCauseType,
     ActionType,
+    DetectionStrategy,
+    WaferSummaryResponse,
+    ProfilingConfig,
 )
 from app.services.spc_service import SPCService
 from app.services.pdm_service import PdmService
 from app.services.smart_analysis_service import SmartAnalysisService
 from app.services.analysis_orchestrator import AnalysisOrchestrator
 from app.services.safety_log_service import SafetyLogService
+from app.services.change_point_service import ChangePointService
+from app.services.wafer_aggregation_service import WaferAggregationService
+from app.services.profiling_service import (
+    Profile,
+    ProfilingService,
+    collapse_stacks,
+    summarize_stacks,
+)
+from app.services.ingest_admission_service import IngestAdmissionService, Admission
+from app.services.telemetry_codec_service import (
+    TelemetryCodecService,
+    TelemetryDecodeError,
+    UnsupportedMediaType,
+    MSGPACK_MEDIA_TYPES,
+)
 from app.database import (
     save_to_influx,
     get_influx_history,
+    get_influx_trend,
     get_postgres_db,
-    influx_client,
+    get_influx_client,
+    new_postgres_session,
     INFLUX_ORG,
     INFLUX_BUCKET,
 )
 
 router = APIRouter()
 
+# keeps coalesced-sample tasks referenced until they finish
+_coalesced_tasks: set = set()
+
 # --- Routes --- #
 
 
@@ -40,37 +68,80 @@ async def health_check(pg_db: Session = Depends(get_postgres_db)):
         return {"status": "degraded", "database": "disconnected", "error": str(e)}
 
 
-@router.post("/telemetry")
+@router.post(
+    "/telemetry",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": TelemetryCodecService.openapi_schema()},
+                MSGPACK_MEDIA_TYPES[0]: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            },
+        }
+    },
+)
 async def receive_telemetry(
-    data: TelemetryData, pg_db: Session = Depends(get_postgres_db)
+    request: Request,
+    strategy: DetectionStrategy | None = None,
+    pg_db: Session = Depends(get_postgres_db),
 ):
-    # immediate safety check
-    temp = data.metrics.get(MetricType.TEMPERATURE, 0)
-
-    interlock_active = temp > 188.0
-    if interlock_active:
-        trigger_safety_interlock(data, pg_db)
-
-    save_to_influx(data)
-
-    # get insights from orchestrator
-    history = get_influx_history(limit=60)
-    health = AnalysisOrchestrator.analyze_tool_health(data, history)
+    """
+    Accepts JSON or MessagePack telemetry (negotiated via Content-Type / Accept).
+    `strategy` overrides the drift detector configured by DRIFT_DETECTION_STRATEGY.
+    """
+    data = await decode_telemetry(request)
+
+    decision = IngestAdmissionService.try_admit(data, strategy)
+    if decision.outcome == Admission.REJECTED:
+        raise HTTPException(
+            status_code=429,
+            detail="Ingest overloaded, retry later",
+            headers={
+                "Retry-After": str(decision.retry_after),
+                **IngestAdmissionService.load_headers(),
+            },
+        )
+    if decision.outcome == Admission.COALESCED:
+        return JSONResponse(
+            status_code=202,
+            content={"status": "coalesced", "wafer_id": data.wafer_id},
+            headers={
+                "Retry-After": str(decision.retry_after),
+                **IngestAdmissionService.load_headers(),
+            },
+        )
 
-    # terminal visibility ('heartbeat' of the fab)
-    print(
-        f"--> Tool: {data.tool_id} | "
-        f"RUL: {health.remaining_life_seconds if health.is_drifting else 'Stable'} | "
-        f"Cause: {health.root_cause} ({health.reason})"
-        f"Action: {health.recommended_action}"
+    profile = ProfilingService.new_profile(
+        "ingest", request.headers.get("x-profile"), request.headers.get("x-admin-token")
     )
 
-    return {
-        "status": "processed",
-        "wafer_id": data.wafer_id,
-        "interlock_active": interlock_active,
-        "predictions": health,
-    }
+    started = time.perf_counter()
+    try:
+        # the interlock is recorded before queueing behind the tool's other samples
+        interlock_active = exceeds_interlock(data)
+        if interlock_active:
+            await run_in_threadpool(trigger_safety_interlock, data, pg_db)
+
+        async with IngestAdmissionService.tool_lock(data.tool_id):
+            content = await run_in_threadpool(
+                process_telemetry, data, strategy, pg_db, interlock_active, profile
+            )
+    finally:
+        if IngestAdmissionService.release(data.tool_id, time.perf_counter() - started):
+            schedule_coalesced(data.tool_id)
+
+    headers = IngestAdmissionService.load_headers()
+    if profile is not None:
+        headers["X-Profile-Id"] = profile.id
+    if TelemetryCodecService.wants_msgpack(request.headers.get("accept")):
+        return Response(
+            content=TelemetryCodecService.encode(content),
+            media_type=MSGPACK_MEDIA_TYPES[0],
+            headers=headers,
+        )
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
 
 
 @router.get("/history")
@@ -102,19 +173,99 @@ async def read_history():
     }
 
 
+@router.get("/history/trend/{tool_id}")
+def read_history_trend(
+    tool_id: str,
+    metric: MetricType = MetricType.TEMPERATURE,
+    range_seconds: int = Query(3600, gt=0),
+    resolution_seconds: int | None = Query(None, gt=0),
+):
+    """
+    Long-range trend (mean/min/max/std per window) served from the coarsest
+    rollup tier that satisfies the requested range and resolution.
+    """
+    return get_influx_trend(tool_id, metric.value, range_seconds, resolution_seconds)
+
+
 @router.get("/quarantine")
 async def get_quarantine_logs(pg_db: Session = Depends(get_postgres_db)):
     return pg_db.query(QuarantineLog).order_by(QuarantineLog.timestamp.desc()).all()
 
 
+@router.get("/wafers/{wafer_id}", response_model=List[WaferSummaryResponse])
+def get_wafer_summaries(wafer_id: str, pg_db: Session = Depends(get_postgres_db)):
+    """Summaries for one wafer, one row per tool it passed through."""
+    summaries = (
+        pg_db.query(WaferSummary)
+        .filter(WaferSummary.wafer_id == wafer_id)
+        .order_by(WaferSummary.completed_at)
+        .all()
+    )
+    if not summaries:
+        raise HTTPException(status_code=404, detail="Wafer not found")
+    return summaries
+
+
+@router.get("/lots/{lot_id}/wafers", response_model=List[WaferSummaryResponse])
+def get_lot_summaries(lot_id: str, pg_db: Session = Depends(get_postgres_db)):
+    return (
+        pg_db.query(WaferSummary)
+        .filter(WaferSummary.lot_id == lot_id)
+        .order_by(WaferSummary.completed_at)
+        .all()
+    )
+
+
+@router.get("/tools/{tool_id}/wafers", response_model=List[WaferSummaryResponse])
+def get_tool_wafer_summaries(
+    tool_id: str,
+    limit: int = Query(100, gt=0, le=1000),
+    pg_db: Session = Depends(get_postgres_db),
+):
+    """Most recent wafers completed on a tool (served by the tool/completed_at index)."""
+    return (
+        pg_db.query(WaferSummary)
+        .filter(WaferSummary.tool_id == tool_id)
+        .order_by(WaferSummary.completed_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
 @router.get("/telemetry/spc/{tool_id}")
-def get_tool_spc_data(tool_id: str):
-    raw_history = get_influx_history(limit=100)
-    tool_data = [
-        {"time": h["time"], "value": h["value"]}
-        for h in raw_history
-        if h["tool_id"] == tool_id and h["metric"] == MetricType.TEMPERATURE.value
-    ]
+def get_tool_spc_data(
+    tool_id: str,
+    request: Request,
+    response: Response,
+    range_seconds: int | None = Query(None, gt=0),
+):
+    profile = ProfilingService.new_profile(
+        "spc", request.headers.get("x-profile"), request.headers.get("x-admin-token")
+    )
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile.id
+
+    with ProfilingService.sampling(profile):
+        return _calculate_tool_spc(tool_id, range_seconds)
+
+
+def _calculate_tool_spc(tool_id: str, range_seconds: int | None):
+    if range_seconds:
+        # long baselines come from window means so cost is independent of raw volume
+        trend = get_influx_trend(tool_id, MetricType.TEMPERATURE.value, range_seconds)
+        tool_data = [
+            {"time": p["time"], "value": p["mean"]}
+            for p in trend["points"]
+            if p["mean"] is not None
+        ]
+    else:
+        raw_history = get_influx_history(limit=100)
+        tool_data = [
+            {"time": h["time"], "value": h["value"]}
+            for h in raw_history
+            if h["tool_id"] == tool_id
+            and h["metric"] == MetricType.TEMPERATURE.value
+        ]
 
     if not tool_data:
         raise HTTPException(status_code=404, detail="Insufficient data for SPC")
@@ -125,7 +276,7 @@ def get_tool_spc_data(tool_id: str):
 @router.get("/latest")
 async def get_latest():
     """Utility to grab the absolute latest state of the primary tool."""
-    query_api = influx_client.query_api()
+    query_api = get_influx_client().query_api()
     flux_query = f"""
         from(bucket: "{INFLUX_BUCKET}")
             |> range(start: -1h)
@@ -155,6 +306,9 @@ async def reset_system(pg_db: Session = Depends(get_postgres_db)):
     and preparing the tool for a new run.
     """
     try:
+        interlocked = [
+            tool_id for (tool_id,) in pg_db.query(QuarantineLog.tool_id).distinct()
+        ]
         rows = pg_db.query(QuarantineLog).delete()
         pg_db.commit()
         print(f"--> RESET: Cleared {rows} quarantine records.")
@@ -163,15 +317,195 @@ async def reset_system(pg_db: Session = Depends(get_postgres_db)):
         print(f"--> RESET ERROR: {e}")
         raise HTTPException(status_code=500, detail="Failed to reset system")
 
+    # only interlocked tools were interrupted; healthy tools keep their open
+    # wafer, detector state and SPC limits
+    for tool_id in interlocked:
+        WaferAggregationService.close(tool_id)
+        # detectors and SPC limits restart together so neither keeps the drift
+        ChangePointService.reset(tool_id)
+        WaferAggregationService.reset_limits(tool_id)
+    WaferAggregationService.flush(pg_db, force=True)
     print("--> SYSTEM RESET SIGNAL SENT TO SIMULATOR")
     SafetyLogService.log_reset()
 
     return {"status": "system_resumed", "message": "Interlock cleared."}
 
 
+# --- Profiling (admin) --- #
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    if not ProfilingService.is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/admin/profiling", dependencies=[Depends(require_admin)])
+def get_profiling_status():
+    return {
+        "config": ProfilingConfig(
+            enabled=ProfilingService.enabled,
+            sample_rate=ProfilingService.sample_rate,
+            interval_ms=ProfilingService.interval_ms,
+        ),
+        "profiles": ProfilingService.recent(),
+    }
+
+
+@router.put("/admin/profiling", dependencies=[Depends(require_admin)])
+def configure_profiling(config: ProfilingConfig):
+    """Turns sampled profiling of live traffic on or off without a redeploy."""
+    ProfilingService.configure(config.enabled, config.sample_rate, config.interval_ms)
+    print(f"--> PROFILING {'ENABLED' if config.enabled else 'DISABLED'}: {config}")
+    return config
+
+
+@router.delete("/admin/profiling/profiles", dependencies=[Depends(require_admin)])
+def clear_profiles():
+    ProfilingService.clear()
+    return {"status": "cleared"}
+
+
+@router.get(
+    "/admin/profiling/profiles/{profile_id}", dependencies=[Depends(require_admin)]
+)
+def get_profile(profile_id: str, format: str = Query("summary")):
+    """`format=collapsed` returns folded stacks for flamegraph tooling."""
+    profile = ProfilingService.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return {**profile.to_dict(), "functions": profile.function_summary()}
+
+
+@router.get("/admin/profiling/flamegraph", dependencies=[Depends(require_admin)])
+def get_flamegraph(label: str | None = None):
+    """Folded stacks merged across profiles since the last clear."""
+    return PlainTextResponse(collapse_stacks(ProfilingService.aggregate(label)))
+
+
+@router.get("/admin/profiling/summary", dependencies=[Depends(require_admin)])
+def get_profiling_summary(label: str | None = None, top: int = Query(25, gt=0)):
+    stacks = ProfilingService.aggregate(label)
+    # stored as measured seconds, so profiles taken at other intervals add up
+    seconds = ProfilingService.aggregate_seconds(label)
+    return {
+        "samples": sum(stacks.values()),
+        "functions": summarize_stacks(seconds, 1.0, top),
+    }
+
+
 # --- Helpers --- #
 
 
+def schedule_coalesced(tool_id: str) -> None:
+    task = asyncio.create_task(process_coalesced(tool_id))
+    _coalesced_tasks.add(task)
+    task.add_done_callback(_coalesced_tasks.discard)
+
+
+async def process_coalesced(tool_id: str) -> None:
+    """
+    Runs a tool's coalesced sample off the request path, after every sample
+    admitted before it. It holds the slot handed over by the last releaser.
+    """
+    handed_over = True
+    while handed_over:
+        started = time.perf_counter()
+        try:
+            async with IngestAdmissionService.tool_lock(tool_id):
+                # a newer priority sample may have superseded it meanwhile
+                pending = IngestAdmissionService.take_pending(tool_id)
+                if pending is not None:
+                    await run_in_threadpool(process_coalesced_sample, *pending)
+        except Exception as e:
+            print(f"!!! COALESCED SAMPLE FAILED ({tool_id}): {e}")
+        finally:
+            handed_over = IngestAdmissionService.release(
+                tool_id, time.perf_counter() - started
+            )
+
+
+def process_coalesced_sample(
+    data: TelemetryData, strategy: DetectionStrategy | None
+) -> None:
+    # the request's session is gone by now
+    pg_db = new_postgres_session()
+    try:
+        interlock_active = exceeds_interlock(data)
+        if interlock_active:
+            trigger_safety_interlock(data, pg_db)
+        _process_telemetry(data, strategy, pg_db, interlock_active)
+    finally:
+        pg_db.close()
+
+
+def exceeds_interlock(data: TelemetryData) -> bool:
+    return data.metrics.get(MetricType.TEMPERATURE, 0) > 188.0
+
+
+def process_telemetry(
+    data: TelemetryData,
+    strategy: DetectionStrategy | None,
+    pg_db: Session,
+    interlock_active: bool,
+    profile: Profile | None = None,
+) -> dict:
+    """Blocking ingest work, run in the threadpool once a sample is admitted."""
+    with ProfilingService.sampling(profile):
+        return _process_telemetry(data, strategy, pg_db, interlock_active)
+
+
+def _process_telemetry(
+    data: TelemetryData,
+    strategy: DetectionStrategy | None,
+    pg_db: Session,
+    interlock_active: bool,
+) -> dict:
+    save_to_influx(data)
+
+    # get insights from orchestrator
+    history = get_influx_history(limit=60)
+    health = AnalysisOrchestrator.analyze_tool_health(data, history, strategy)
+
+    # per-wafer rollup, persisted in batches; an interlocked wafer is written
+    # right away so it's queryable and survives a restart
+    WaferAggregationService.observe(data, health, interlock_active)
+    WaferAggregationService.flush(pg_db, force=interlock_active)
+
+    # terminal visibility ('heartbeat' of the fab)
+    print(
+        f"--> Tool: {data.tool_id} | "
+        f"RUL: {health.remaining_life_seconds if health.is_drifting else 'Stable'} | "
+        f"Cause: {health.root_cause} ({health.reason})"
+        f"Action: {health.recommended_action}"
+    )
+
+    return {
+        "status": "processed",
+        "wafer_id": data.wafer_id,
+        "interlock_active": interlock_active,
+        "predictions": health,
+    }
+
+
+async def decode_telemetry(request: Request) -> TelemetryData:
+    body = await request.body()
+    trusted = TelemetryCodecService.is_trusted_gateway(
+        request.headers.get("x-gateway-token")
+    )
+    try:
+        return TelemetryCodecService.decode(
+            body, request.headers.get("content-type"), trusted=trusted
+        )
+    except UnsupportedMediaType as e:
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported telemetry encoding: {e}"
+        )
+    except TelemetryDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 def trigger_safety_interlock(data: TelemetryData, pg_db: Session):
     temp = data.metrics.get(MetricType.TEMPERATURE, 0)
 
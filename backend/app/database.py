@@ -1,10 +1,10 @@
 import os
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
+from sqlalchemy.orm import sessionmaker, declarative_base
 from app.schemas.schemas import MetricType
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+from app.services.rollup_service import RollupService, ROLLUP_TIERS, RAW_TIER
 
 # --- ENVIRONMENT CONFIGURATION --- #
 
@@ -20,16 +20,42 @@ INFLUX_URL = os.getenv("INFLUXDB_URL", "http://influx_db:8086")
 INFLUX_TOKEN = os.getenv("INFLUXDB_TOKEN")
 INFLUX_ORG = os.getenv("INFLUXDB_ORG", "greenfield_inc")
 INFLUX_BUCKET = os.getenv("INFLUXDB_BUCKET", "wafer_telemetry")
+# raw history rolled up when a tier's task is first registered
+ROLLUP_BACKFILL_SECONDS = int(os.getenv("ROLLUP_BACKFILL_SECONDS", str(7 * 86400)))
+
+# earliest point held by each measurement, worked out once the rollups are
+# registered (refresh_tier_coverage) so trend queries never probe for it
+_tier_coverage: Dict[str, datetime] = {}
+
+# Clients are created on first use (or by the app lifespan) rather than at import,
+# so importing the app never requires live databases.
+_pg_engine = None
+_pg_session_factory = None
+_influx_client = None
+_influx_write_api = None
 
 # --- POSTGRESQL SETUP --- #
 
-pg_engine = create_engine(POSTGRES_URL)
-PostgresSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=pg_engine)
 Base = declarative_base()
 
 
+def get_pg_engine():
+    global _pg_engine, _pg_session_factory
+    if _pg_engine is None:
+        _pg_engine = create_engine(POSTGRES_URL)
+        _pg_session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=_pg_engine
+        )
+    return _pg_engine
+
+
+def new_postgres_session():
+    get_pg_engine()
+    return _pg_session_factory()
+
+
 def get_postgres_db():
-    db = PostgresSessionLocal()
+    db = new_postgres_session()
     try:
         yield db
     finally:
@@ -38,11 +64,47 @@ def get_postgres_db():
 
 # --- INFLUXDB SETUP --- #
 
-influx_client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-influx_write_api = influx_client.write_api(write_options=SYNCHRONOUS)
+
+def get_influx_client():
+    global _influx_client
+    if _influx_client is None:
+        from influxdb_client import InfluxDBClient
+
+        _influx_client = InfluxDBClient(
+            url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG
+        )
+    return _influx_client
+
+
+def get_influx_write_api():
+    global _influx_write_api
+    if _influx_write_api is None:
+        from influxdb_client.client.write_api import SYNCHRONOUS
+
+        _influx_write_api = get_influx_client().write_api(write_options=SYNCHRONOUS)
+    return _influx_write_api
+
+
+def init_clients():
+    get_pg_engine()
+    get_influx_write_api()
+
+
+def close_clients():
+    global _pg_engine, _pg_session_factory, _influx_client, _influx_write_api
+    if _influx_write_api is not None:
+        _influx_write_api.close()
+    if _influx_client is not None:
+        _influx_client.close()
+    if _pg_engine is not None:
+        _pg_engine.dispose()
+    _pg_engine = _pg_session_factory = None
+    _influx_client = _influx_write_api = None
 
 
 def save_to_influx(data):
+    from influxdb_client import Point, WritePrecision
+
     point = (
         Point("wafer_metrics")
         .tag("tool_id", data.tool_id)
@@ -56,11 +118,11 @@ def save_to_influx(data):
             point.field(metric.value, float(val))
 
     point.time(data.timestamp, WritePrecision.NS)
-    influx_write_api.write(INFLUX_BUCKET, INFLUX_ORG, point)
+    get_influx_write_api().write(INFLUX_BUCKET, INFLUX_ORG, point)
 
 
 def get_influx_history(limit=100):
-    query_api = influx_client.query_api()
+    query_api = get_influx_client().query_api()
     query = f"""
         from(bucket: "{INFLUX_BUCKET}") 
         |> range(start: -1h) 
@@ -83,3 +145,109 @@ def get_influx_history(limit=100):
                 }
             )
     return history
+
+
+def ensure_rollup_tasks():
+    """
+    Registers the downsampling tasks for each rollup tier if they don't exist yet.
+    A new tier is backfilled from raw data, since its task only covers new samples.
+    """
+    from influxdb_client import TaskCreateRequest
+
+    client = get_influx_client()
+    tasks_api = client.tasks_api()
+    created = []
+    for tier in ROLLUP_TIERS:
+        if tasks_api.find_tasks(name=tier.task_name, org=INFLUX_ORG):
+            continue
+        client.query_api().query(
+            org=INFLUX_ORG,
+            query=RollupService.build_backfill_flux(
+                tier, INFLUX_BUCKET, INFLUX_ORG, ROLLUP_BACKFILL_SECONDS
+            ),
+        )
+        tasks_api.create_task(
+            task_create_request=TaskCreateRequest(
+                org=INFLUX_ORG,
+                flux=RollupService.build_task_flux(tier, INFLUX_BUCKET, INFLUX_ORG),
+                description=f"Downsamples wafer telemetry into {tier.measurement}",
+                status="active",
+            )
+        )
+        created.append(tier.task_name)
+    return created
+
+
+def refresh_tier_coverage():
+    """Caches how far back raw data and each rollup tier reach."""
+    query_api = get_influx_client().query_api()
+    for tier in [RAW_TIER, *ROLLUP_TIERS]:
+        result = query_api.query(
+            org=INFLUX_ORG,
+            query=RollupService.build_first_flux(),
+            params={"bucket": INFLUX_BUCKET, "measurement": tier.measurement},
+        )
+        times = [record.get_time() for table in result for record in table.records]
+        if times:
+            _tier_coverage[tier.measurement] = min(times)
+    return dict(_tier_coverage)
+
+
+def _covering_tier(tier, range_seconds):
+    """
+    Falls back to finer tiers when a rollup doesn't reach back as far as the raw
+    data does (e.g. history older than the backfill window, or coverage not yet
+    known while the rollups are being prepared).
+    """
+    if tier is RAW_TIER:
+        return tier
+
+    wanted = datetime.now(timezone.utc) - timedelta(seconds=range_seconds)
+    raw_start = _tier_coverage.get(RAW_TIER.measurement)
+    if raw_start is not None:
+        wanted = max(wanted, raw_start)
+
+    for candidate in reversed(ROLLUP_TIERS):
+        if candidate.window_seconds > tier.window_seconds:
+            continue
+        start = _tier_coverage.get(candidate.measurement)
+        # rollup points are stamped at window end, allow one window of slack
+        slack = timedelta(seconds=2 * candidate.window_seconds)
+        if start is not None and start <= wanted + slack:
+            return candidate
+    return RAW_TIER
+
+
+def get_influx_trend(tool_id, metric, range_seconds=3600, resolution_seconds=None):
+    """
+    Returns mean/min/max/std per window from the coarsest tier that satisfies
+    the requested range and resolution and actually covers the range.
+    """
+    selected = RollupService.select_tier(range_seconds, resolution_seconds)
+    tier = _covering_tier(selected, range_seconds)
+    if tier is RAW_TIER:
+        # keep the resolution of the tier we wanted when falling back to raw
+        resolution_seconds = (
+            selected.window_seconds
+            or RollupService.effective_resolution(range_seconds, resolution_seconds)
+        )
+
+    result = get_influx_client().query_api().query(
+        org=INFLUX_ORG,
+        query=RollupService.build_query_flux(tier, range_seconds, resolution_seconds),
+        params=RollupService.query_params(tier, INFLUX_BUCKET, tool_id, metric),
+    )
+
+    points = []
+    for table in result:
+        for record in table.records:
+            stats = {s: record.values.get(s) for s in ("mean", "min", "max", "std")}
+            points.append({"time": record.get_time(), **stats})
+
+    return {
+        "tool_id": tool_id,
+        "metric": metric,
+        "tier": tier.measurement,
+        "window_seconds": tier.window_seconds or resolution_seconds,
+        "points": points,
+    }
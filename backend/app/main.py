@@ -1,15 +1,64 @@
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router as spc_router
-from app.database import pg_engine, Base
-import app.models.models as models
-from app.database import PG_HOST, INFLUX_URL
+from app.services.wafer_aggregation_service import WaferAggregationService
+from app.database import (
+    PG_HOST,
+    INFLUX_URL,
+    init_clients,
+    close_clients,
+    new_postgres_session,
+    ensure_rollup_tasks,
+    refresh_tier_coverage,
+)
 import logging
 
-# --- Database Initialization --- #
-Base.metadata.create_all(bind=pg_engine)
+# NOTE: schema migrations live in app.migrations and run before the server starts.
+
+
+def _warm_heavy_imports():
+    """Loads the analysis libraries off the request path once the server is up."""
+    import scipy.stats  # noqa: F401
+    import polars  # noqa: F401
+
+
+def _prepare_rollups():
+    """
+    Registers (and backfills) the rollup tiers off the startup path, then caches
+    how far each tier reaches. Trend queries fall back to finer tiers until then.
+    """
+    try:
+        created = ensure_rollup_tasks()
+        print(f"Rollup tasks registered: {created or 'up to date'}")
+        refresh_tier_coverage()
+    except Exception as e:
+        print(f"!!! Rollup task registration failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_clients()
+    print("\n" + "=" * 50)
+    print("🚀 GREENFIELD DIGITAL TWIN API IS REACHABLE")
+    print(f"Connected to Postgres: {PG_HOST}")
+    print(f"Connected to InfluxDB: {INFLUX_URL}")
+    print("=" * 50 + "\n")
+    threading.Thread(target=_warm_heavy_imports, daemon=True).start()
+    threading.Thread(target=_prepare_rollups, daemon=True).start()
+
+    yield
+
+    pg_db = new_postgres_session()
+    try:
+        WaferAggregationService.flush(pg_db, force=True)
+    finally:
+        pg_db.close()
+    close_clients()
 
-app = FastAPI(title="Greenfield Digital Twin API")
+
+app = FastAPI(title="Greenfield Digital Twin API", lifespan=lifespan)
 
 # CORS enablement to frontend
 origins = [
@@ -34,12 +83,3 @@ async def root():
         "version": "1.0.0",
         "documentation": "/docs",
     }
-
-
-@app.on_event("startup")
-async def startup_event():
-    print("\n" + "=" * 50)
-    print("🚀 GREENFIELD DIGITAL TWIN API IS REACHABLE")
-    print(f"Connected to Postgres: {PG_HOST}")
-    print(f"Connected to InfluxDB: {INFLUX_URL}")
-    print("=" * 50 + "\n")
@@ -0,0 +1,16 @@
+"""
+Schema Migrations
+Run once per deploy, before the API starts: `python -m app.migrations`
+"""
+
+from app.database import Base, get_pg_engine, POSTGRES_URL
+import app.models.models  # noqa: F401  (registers tables on Base.metadata)
+
+
+def run_migrations() -> None:
+    Base.metadata.create_all(bind=get_pg_engine())
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print(f"--> MIGRATIONS APPLIED: {POSTGRES_URL.rsplit('@', 1)[-1]}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -22,3 +22,28 @@ class QuarantineLog(Base):
     threshold_limit = Column(Float)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     is_cleared = Column(Boolean, default=False)
+
+
+class WaferSummary(Base):
+    """
+    Per-wafer telemetry rollup, closed out when a tool moves to the next wafer.
+    """
+
+    __tablename__ = "wafer_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    wafer_id = Column(String, index=True)
+    lot_id = Column(String, index=True)
+    tool_id = Column(String, index=True)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    duration_seconds = Column(Float)
+    sample_count = Column(Integer)
+    metric_stats = Column(JSON)
+    spc_violations = Column(Integer, default=0)
+    interlock_triggered = Column(Boolean, default=False)
+    rul_at_completion = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_wafer_summaries_tool_completed", "tool_id", "completed_at"),
+    )
@@ -0,0 +1,107 @@
+"""
+Offline Profiling
+Replays recorded simulator samples through the analysis hot path (no databases)
+under the stack sampler, then writes folded stacks and prints per-function timings.
+
+    python -m app.profile_replay samples.jsonl --out ingest.folded
+    flamegraph.pl ingest.folded > ingest.svg
+
+Record samples by running the simulator with RECORD_PATH=samples.jsonl.
+"""
+
+import argparse
+import json
+import time
+from collections import deque
+from typing import Dict
+
+from app.schemas.schemas import TelemetryData, MetricType, DetectionStrategy
+from app.services.analysis_orchestrator import AnalysisOrchestrator
+from app.services.spc_service import SPCService
+from app.services.profiling_service import (
+    ProfilingService,
+    Profile,
+    collapse_stacks,
+)
+
+# mirrors get_influx_history(limit=60): newest-first, per metric
+HISTORY_LIMIT = 60
+
+
+def load_samples(path: str):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield TelemetryData.model_validate_json(line)
+
+
+def replay(samples, strategy: DetectionStrategy | None, spc_every: int) -> int:
+    history: Dict[tuple, deque] = {}
+    count = 0
+
+    for data in samples:
+        for metric, value in data.metrics.items():
+            window = history.setdefault(
+                (data.tool_id, metric), deque(maxlen=HISTORY_LIMIT)
+            )
+            window.appendleft(
+                {
+                    "time": data.timestamp,
+                    "metric": metric.value,
+                    "value": value,
+                    "tool_id": data.tool_id,
+                    "wafer_id": data.wafer_id,
+                }
+            )
+
+        raw_history = [entry for window in history.values() for entry in window]
+        AnalysisOrchestrator.analyze_tool_health(data, raw_history, strategy)
+
+        count += 1
+        if spc_every and count % spc_every == 0:
+            temps = history.get((data.tool_id, MetricType.TEMPERATURE), [])
+            SPCService.calculate_spc_metrics(
+                [{"time": h["time"], "value": h["value"]} for h in temps]
+            )
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile an offline telemetry replay.")
+    parser.add_argument("input", help="JSONL file of simulator payloads")
+    parser.add_argument("--out", default="replay.folded", help="folded stacks output")
+    parser.add_argument("--strategy", type=DetectionStrategy, default=None)
+    parser.add_argument("--spc-every", type=int, default=10)
+    parser.add_argument("--interval-ms", type=float, default=1.0)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    samples = list(load_samples(args.input))
+
+    # services import these lazily; load them first so the profile shows steady state
+    import scipy.stats  # noqa: F401
+    import polars  # noqa: F401
+
+    profile = Profile("replay", args.interval_ms / 1000)
+
+    started = time.perf_counter()
+    with ProfilingService.sampling(profile):
+        count = replay(samples, args.strategy, args.spc_every)
+    elapsed = time.perf_counter() - started
+
+    with open(args.out, "w") as f:
+        f.write(collapse_stacks(profile.stacks) + "\n")
+
+    print(f"Replayed {count} samples in {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+    print(f"{profile.sample_count} stack samples written to {args.out}\n")
+    print(f"{'total ms':>10} {'self ms':>10} {'total %':>8}  function")
+    for row in profile.function_summary(args.top):
+        print(
+            f"{row['total_ms']:>10.1f} {row['self_ms']:>10.1f} "
+            f"{row['total_pct']:>7.1f}%  {row['function']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
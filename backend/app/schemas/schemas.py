@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Dict
 from enum import Enum
@@ -29,6 +29,13 @@ class ActionType(str, Enum):
     EMERGENCY_STOP = "EMERGENCY_STOP_REQUIRED"
 
 
+class DetectionStrategy(str, Enum):
+    LINEAR_REGRESSION = "linear_regression"
+    CUSUM = "cusum"
+    EWMA = "ewma"
+    BOCPD = "bocpd"
+
+
 class TelemetryData(BaseModel):
     timestamp: datetime
     tool_id: str
@@ -36,6 +43,7 @@ class TelemetryData(BaseModel):
     metrics: Dict[MetricType, float]
     status: str
     location: str
+    lot_id: str | None = None
 
 
 class QuarantineResponse(BaseModel):
@@ -49,12 +57,38 @@ class QuarantineResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MetricSummary(BaseModel):
+    count: int
+    min: float
+    max: float
+    mean: float
+    std: float
+
+
+class WaferSummaryResponse(BaseModel):
+    id: int
+    wafer_id: str
+    lot_id: str | None
+    tool_id: str
+    started_at: datetime
+    completed_at: datetime
+    duration_seconds: float
+    sample_count: int
+    metric_stats: Dict[MetricType, MetricSummary]
+    spc_violations: int
+    interlock_triggered: bool
+    rul_at_completion: float | None
+    model_config = ConfigDict(from_attributes=True)
+
+
 class PredictionResponse(BaseModel):
     remaining_life_seconds: float | None = None
     is_drifting: bool
     root_cause: RootCauseType
     reason: str
     recommended_action: ActionType
+    detection_strategy: DetectionStrategy = DetectionStrategy.LINEAR_REGRESSION
+    drift_onset: datetime | None = None
 
 
 class TelemetryProcessResponse(BaseModel):
@@ -62,3 +96,9 @@ class TelemetryProcessResponse(BaseModel):
     wafer_id: str
     interlock_active: bool
     predictions: PredictionResponse
+
+
+class ProfilingConfig(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(1.0, gt=0, le=1)
+    interval_ms: float = Field(5.0, ge=1, le=1000)
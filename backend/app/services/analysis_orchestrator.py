@@ -1,3 +1,4 @@
+import os
 from typing import List, Dict, Any
 from app.schemas.schemas import (
     TelemetryData,
@@ -5,19 +6,31 @@ from app.schemas.schemas import (
     RootCauseType,
     ActionType,
     PredictionResponse,
+    DetectionStrategy,
 )
 from app.services.pdm_service import PdmService
 from app.services.smart_analysis_service import SmartAnalysisService
+from app.services.change_point_service import ChangePointService
+
+DEFAULT_STRATEGY = DetectionStrategy(
+    os.getenv("DRIFT_DETECTION_STRATEGY", DetectionStrategy.LINEAR_REGRESSION.value)
+)
 
 
 class AnalysisOrchestrator:
     @staticmethod
     def analyze_tool_health(
-        data: TelemetryData, raw_history: List[dict]
+        data: TelemetryData,
+        raw_history: List[dict],
+        strategy: DetectionStrategy | None = None,
     ) -> PredictionResponse:
         """
         Orchestrates tool health analysis.
+        Non-linear strategies run a streaming change-point detector on each sample
+        so drift onset is flagged before the regression slope becomes significant.
         """
+        strategy = strategy or DEFAULT_STRATEGY
+
         # extract content
         tool_id = data.tool_id
         current_temp = data.metrics.get(MetricType.TEMPERATURE, 0.0)
@@ -29,11 +42,25 @@ class AnalysisOrchestrator:
         # prognostic analysis (RUL)
         rul_seconds = PdmService.predict_remaining_life(temp_vals)
 
+        # change-point detection (drift onset); a sample without a temperature
+        # reading says nothing about the process, so it isn't fed to the detector
+        drift_onset = None
+        if (
+            strategy != DetectionStrategy.LINEAR_REGRESSION
+            and MetricType.TEMPERATURE in data.metrics
+        ):
+            detection = ChangePointService.update(
+                tool_id, MetricType.TEMPERATURE, current_temp, data.timestamp, strategy
+            )
+            if detection.detected:
+                drift_onset = detection.onset or data.timestamp
+        is_drifting = rul_seconds is not None or drift_onset is not None
+
         # smart analysis (RCA & countermeasure)
         root_cause = RootCauseType.NORMAL
         reason = "Stable"
         action = ActionType.MONITOR
-        if rul_seconds is not None:
+        if is_drifting:
             baseline = SmartAnalysisService.get_adaptive_baseline(temp_vals)
             severity = current_temp - baseline
 
@@ -44,10 +71,12 @@ class AnalysisOrchestrator:
 
         return PredictionResponse(
             remaining_life_seconds=rul_seconds,
-            is_drifting=rul_seconds is not None,
+            is_drifting=is_drifting,
             root_cause=root_cause,
             reason=reason,
             recommended_action=action,
+            detection_strategy=strategy,
+            drift_onset=drift_onset,
         )
 
     @staticmethod
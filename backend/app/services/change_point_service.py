@@ -0,0 +1,335 @@
+import math
+import os
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.schemas.schemas import MetricType, DetectionStrategy
+
+
+@dataclass
+class DetectionResult:
+    detected: bool
+    score: float
+    onset: datetime | None = None
+
+
+@dataclass
+class ProcessSpec:
+    """In-control process target and noise, known from the recipe and SPC limits."""
+
+    target: float
+    sigma: float
+
+
+# drift usually starts within a few samples of a PM, so the baseline comes from
+# the recipe rather than from the first samples a tool happens to report
+PROCESS_SPECS: Dict[MetricType, ProcessSpec] = {
+    MetricType.TEMPERATURE: ProcessSpec(
+        target=float(os.getenv("TEMPERATURE_TARGET", "180.0")),
+        sigma=float(os.getenv("TEMPERATURE_SIGMA", "0.3")),
+    ),
+}
+
+
+class _Baseline:
+    """
+    In-control mean/sigma. Taken from a ProcessSpec when one is known, otherwise
+    estimated from a short warmup with median/MAD so early drift can't skew it.
+    """
+
+    def __init__(self, warmup: int, min_sigma: float, spec: ProcessSpec | None):
+        self.warmup = warmup
+        self.min_sigma = min_sigma
+        self._samples: list[float] = []
+        self.mean = 0.0
+        self.sigma = min_sigma
+        self.ready = False
+        if spec is not None:
+            self.mean = spec.target
+            self.sigma = max(spec.sigma, min_sigma)
+            self.ready = True
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+        if len(self._samples) < self.warmup:
+            return
+        self.mean = float(np.median(self._samples))
+        mad = float(np.median(np.abs(np.array(self._samples) - self.mean)))
+        self.sigma = max(1.4826 * mad, self.min_sigma)
+        self.ready = True
+        self._samples = []
+
+
+class CusumDetector:
+    """
+    Two-sided tabular CUSUM on standardized residuals.
+    k is the allowance and h the decision interval, both in sigma units.
+    """
+
+    def __init__(
+        self,
+        k: float = 0.5,
+        h: float = 12.0,
+        spec: ProcessSpec | None = None,
+        warmup: int = 20,
+        min_sigma: float = 0.05,
+    ):
+        self.k = k
+        self.h = h
+        self.baseline = _Baseline(warmup, min_sigma, spec)
+        self.s_hi = 0.0
+        self.s_lo = 0.0
+        self._hi_start: datetime | None = None
+        self._lo_start: datetime | None = None
+
+    def update(self, value: float, timestamp: datetime) -> DetectionResult:
+        if not self.baseline.ready:
+            self.baseline.add(value)
+            return DetectionResult(detected=False, score=0.0)
+
+        z = (value - self.baseline.mean) / self.baseline.sigma
+
+        # remember where each side last left zero, that's the onset estimate
+        if self.s_hi == 0.0:
+            self._hi_start = timestamp
+        if self.s_lo == 0.0:
+            self._lo_start = timestamp
+        self.s_hi = max(0.0, self.s_hi + z - self.k)
+        self.s_lo = max(0.0, self.s_lo - z - self.k)
+
+        score = max(self.s_hi, self.s_lo) / self.h
+        if self.s_hi > self.h:
+            return DetectionResult(True, score, self._hi_start)
+        if self.s_lo > self.h:
+            return DetectionResult(True, score, self._lo_start)
+        return DetectionResult(False, score)
+
+
+class EwmaDetector:
+    """
+    EWMA control chart with time-varying limits mu +/- L * sigma_z.
+    """
+
+    def __init__(
+        self,
+        lam: float = 0.1,
+        L: float = 4.0,
+        spec: ProcessSpec | None = None,
+        warmup: int = 20,
+        min_sigma: float = 0.05,
+    ):
+        self.lam = lam
+        self.L = L
+        self.baseline = _Baseline(warmup, min_sigma, spec)
+        self.z = None
+        self.n = 0
+        self._in_control_since: datetime | None = None
+
+    def update(self, value: float, timestamp: datetime) -> DetectionResult:
+        if not self.baseline.ready:
+            self.baseline.add(value)
+            return DetectionResult(detected=False, score=0.0)
+
+        if self.z is None:
+            self.z = self.baseline.mean
+        self.n += 1
+        self.z = self.lam * value + (1 - self.lam) * self.z
+
+        decay = 1 - (1 - self.lam) ** (2 * self.n)
+        sigma_z = self.baseline.sigma * math.sqrt(self.lam / (2 - self.lam) * decay)
+        score = abs(self.z - self.baseline.mean) / (self.L * sigma_z)
+
+        if score <= 1.0:
+            self._in_control_since = timestamp
+            return DetectionResult(False, score)
+        return DetectionResult(True, score, self._in_control_since)
+
+
+class BocpdDetector:
+    """
+    Bayesian online change-point detection (Adams & MacKay) with a
+    Normal-Inverse-Gamma model. Run lengths are truncated to max_run_length,
+    so each update costs a fixed amount of work.
+    """
+
+    def __init__(
+        self,
+        hazard: float = 1 / 5000,
+        max_run_length: int = 200,
+        short_run: int = 15,
+        threshold: float = 0.5,
+        kappa0: float = 1.0,
+        alpha0: float = 1.0,
+        beta0: float = 0.05,
+        spec: ProcessSpec | None = None,
+        warmup: int = 30,
+    ):
+        self.hazard = hazard
+        self.max_run_length = max_run_length
+        self.short_run = short_run
+        self.threshold = threshold
+        self.kappa0, self.alpha0, self.beta0 = kappa0, alpha0, beta0
+        self.warmup = warmup
+        self.n = 0
+
+        # alpha only depends on the run length, so the gamma terms are fixed
+        alphas = alpha0 + 0.5 * np.arange(max_run_length + 1)
+        self._log_norm = np.array(
+            [math.lgamma(a + 0.5) - math.lgamma(a) for a in alphas]
+        )
+
+        self.run_probs = None
+        self.mu = None
+        self.kappa = None
+        self.alpha = None
+        self.beta = None
+        self._timestamps: deque = deque(maxlen=max_run_length + 1)
+        if spec is not None:
+            self._seed(spec)
+
+    def _seed(self, spec: ProcessSpec) -> None:
+        """Starts as if the tool had already run in control at spec for a full window."""
+        runs = np.arange(self.max_run_length + 1)
+        self.run_probs = np.zeros(len(runs))
+        self.run_probs[-1] = 1.0
+        self.mu = np.full(len(runs), spec.target)
+        self.kappa = self.kappa0 + runs
+        self.alpha = self.alpha0 + 0.5 * runs
+        self.beta = self.beta0 + 0.5 * runs * spec.sigma**2
+        # short runs are impossible from here, so no warmup is needed
+        self.warmup = 0
+
+    def _reset_params(self, value: float) -> None:
+        self.run_probs = np.array([1.0])
+        self.mu = np.array([value])
+        self.kappa = np.array([self.kappa0])
+        self.alpha = np.array([self.alpha0])
+        self.beta = np.array([self.beta0])
+
+    def update(self, value: float, timestamp: datetime) -> DetectionResult:
+        if self.run_probs is None:
+            self._reset_params(value)
+        self.n += 1
+        self._timestamps.append(timestamp)
+
+        # student-t predictive for every live run length
+        size = len(self.run_probs)
+        scale2 = self.beta * (self.kappa + 1) / (self.alpha * self.kappa)
+        nu = 2 * self.alpha
+        log_pred = (
+            self._log_norm[:size]
+            - 0.5 * np.log(np.pi * nu * scale2)
+            - (self.alpha + 0.5) * np.log1p((value - self.mu) ** 2 / (nu * scale2))
+        )
+        pred = np.exp(log_pred)
+
+        growth = self.run_probs * pred * (1 - self.hazard)
+        change = float(np.sum(self.run_probs * pred * self.hazard))
+        run_probs = np.concatenate(([change], growth))
+
+        new_mu = (self.kappa * self.mu + value) / (self.kappa + 1)
+        new_beta = self.beta + self.kappa * (value - self.mu) ** 2 / (
+            2 * (self.kappa + 1)
+        )
+        self.mu = np.concatenate(([value], new_mu))
+        self.kappa = np.concatenate(([self.kappa0], self.kappa + 1))
+        self.alpha = np.concatenate(([self.alpha0], self.alpha + 0.5))
+        self.beta = np.concatenate(([self.beta0], new_beta))
+
+        if len(run_probs) > self.max_run_length + 1:
+            run_probs[self.max_run_length] += run_probs[self.max_run_length + 1 :].sum()
+            keep = self.max_run_length + 1
+            run_probs = run_probs[:keep]
+            self.mu, self.kappa = self.mu[:keep], self.kappa[:keep]
+            self.alpha, self.beta = self.alpha[:keep], self.beta[:keep]
+
+        total = run_probs.sum()
+        if total <= 0 or not np.isfinite(total):
+            self._reset_params(value)
+            return DetectionResult(False, 0.0)
+        self.run_probs = run_probs / total
+
+        map_run = int(np.argmax(self.run_probs))
+        score = float(self.run_probs[: self.short_run + 1].sum())
+        if self.n <= self.warmup or score < self.threshold:
+            return DetectionResult(False, score / self.threshold)
+
+        # a short MAP run means the current regime began map_run samples ago
+        onset = self._timestamps[-min(map_run + 1, len(self._timestamps))]
+        return DetectionResult(True, score / self.threshold, onset)
+
+
+# BOCPD can sit quiet for ~25 samples between change points on a slow ramp
+ALARM_CLEAR_SAMPLES = 50
+
+_DETECTORS = {
+    DetectionStrategy.CUSUM: CusumDetector,
+    DetectionStrategy.EWMA: EwmaDetector,
+    DetectionStrategy.BOCPD: BocpdDetector,
+}
+
+
+class ChangePointService:
+    """
+    Keeps one streaming detector per (tool, metric, strategy). An alarm holds
+    its onset while it lasts and clears once the detector has been back in
+    control for ALARM_CLEAR_SAMPLES samples, so a false alarm doesn't keep the
+    tool flagged until someone resets it.
+    """
+
+    _detectors: Dict[Tuple[str, MetricType, DetectionStrategy], object] = {}
+    _alarms: Dict[Tuple[str, MetricType, DetectionStrategy], DetectionResult] = {}
+    _quiet: Dict[Tuple[str, MetricType, DetectionStrategy], int] = {}
+
+    @classmethod
+    def update(
+        cls,
+        tool_id: str,
+        metric: MetricType,
+        value: float,
+        timestamp: datetime,
+        strategy: DetectionStrategy,
+    ) -> DetectionResult:
+        if strategy not in _DETECTORS:
+            raise ValueError(f"{strategy.value} is not a streaming detector")
+
+        key = (tool_id, metric, strategy)
+        detector = cls._detectors.get(key)
+        if detector is None:
+            detector = cls._detectors[key] = _DETECTORS[strategy](
+                spec=PROCESS_SPECS.get(metric)
+            )
+
+        result = detector.update(value, timestamp)
+
+        alarm = cls._alarms.get(key)
+        if result.detected:
+            cls._quiet[key] = 0
+            if alarm is None:
+                cls._alarms[key] = result
+                return result
+        elif alarm is None:
+            return result
+        else:
+            cls._quiet[key] += 1
+            if cls._quiet[key] >= ALARM_CLEAR_SAMPLES:
+                del cls._alarms[key], cls._quiet[key]
+                return result
+
+        alarm.score = result.score
+        return alarm
+
+    @classmethod
+    def reset(cls, tool_id: str | None = None) -> None:
+        stores = (cls._detectors, cls._alarms, cls._quiet)
+        if tool_id is None:
+            for store in stores:
+                store.clear()
+            return
+        for store in stores:
+            for key in [k for k in store if k[0] == tool_id]:
+                del store[key]
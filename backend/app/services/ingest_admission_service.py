@@ -0,0 +1,145 @@
+import asyncio
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from app.schemas.schemas import TelemetryData, MetricType, DetectionStrategy
+
+# queued + running samples allowed per tool before routine samples are coalesced
+MAX_INFLIGHT_PER_TOOL = int(os.getenv("INGEST_MAX_INFLIGHT_PER_TOOL", "2"))
+# fleet-wide bound before routine samples are shed with 429
+MAX_INFLIGHT_TOTAL = int(os.getenv("INGEST_MAX_INFLIGHT_TOTAL", "32"))
+# smoothed processing latency above which routine samples are shed
+TARGET_LATENCY_SECONDS = float(os.getenv("INGEST_TARGET_LATENCY_SECONDS", "1.0"))
+
+INTERLOCK_LIMIT = 188.0
+NEAR_LIMIT_MARGIN = 3.0
+# tool-reported alarm states that bypass admission control; anything else a
+# gateway sends is treated as routine
+PRIORITY_STATUSES = frozenset({"WARNING_HIGH_TEMP", "CRITICAL_OVERHEAT"})
+LATENCY_ALPHA = 0.2
+
+
+class Admission:
+    ADMITTED = "admitted"
+    COALESCED = "coalesced"
+    REJECTED = "rejected"
+
+
+@dataclass
+class AdmissionDecision:
+    outcome: str
+    priority: bool
+    retry_after: int | None = None
+
+
+class IngestAdmissionService:
+    """
+    Admission control for telemetry ingest. Runs on the event loop only, so the
+    counters need no locking. Samples at or near the interlock limit are always
+    admitted; routine samples are coalesced per tool or shed under overload.
+
+    A tool's coalesced sample is only run once everything admitted before it has
+    released, so per-tool processing stays in arrival order.
+    """
+
+    _inflight: Dict[str, int] = {}
+    _total = 0
+    _latency_ewma = 0.0
+    _pending: Dict[str, Tuple[TelemetryData, DetectionStrategy | None]] = {}
+    _tool_locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def is_priority(data: TelemetryData) -> bool:
+        temp = data.metrics.get(MetricType.TEMPERATURE, 0.0)
+        return (
+            temp >= INTERLOCK_LIMIT - NEAR_LIMIT_MARGIN
+            or data.status in PRIORITY_STATUSES
+        )
+
+    @classmethod
+    def try_admit(
+        cls, data: TelemetryData, strategy: DetectionStrategy | None = None
+    ) -> AdmissionDecision:
+        priority = cls.is_priority(data)
+        tool_id = data.tool_id
+
+        if priority:
+            # newer than any coalesced sample, which it supersedes
+            cls._pending.pop(tool_id, None)
+        else:
+            # with nothing in flight, admit anyway so the latency signal can recover
+            overloaded = cls._total >= MAX_INFLIGHT_TOTAL or (
+                cls._total > 0 and cls._latency_ewma > TARGET_LATENCY_SECONDS
+            )
+            if overloaded:
+                return AdmissionDecision(
+                    Admission.REJECTED, priority, cls._retry_after()
+                )
+            if (
+                tool_id in cls._pending
+                or cls._inflight.get(tool_id, 0) >= MAX_INFLIGHT_PER_TOOL
+            ):
+                # newest routine sample wins; it runs after everything already admitted
+                cls._pending[tool_id] = (data, strategy)
+                return AdmissionDecision(
+                    Admission.COALESCED, priority, cls._retry_after()
+                )
+
+        cls._acquire(tool_id)
+        return AdmissionDecision(Admission.ADMITTED, priority)
+
+    @classmethod
+    def release(cls, tool_id: str, elapsed_seconds: float) -> bool:
+        """
+        Frees a slot. Returns True when the caller was the tool's last one out and
+        a coalesced sample is waiting: the slot is then kept for it and the caller
+        must run it (see take_pending).
+        """
+        cls._inflight[tool_id] -= 1
+        if cls._inflight[tool_id] <= 0:
+            del cls._inflight[tool_id]
+        cls._total -= 1
+        cls._latency_ewma = (
+            LATENCY_ALPHA * elapsed_seconds + (1 - LATENCY_ALPHA) * cls._latency_ewma
+        )
+
+        if tool_id in cls._inflight or tool_id not in cls._pending:
+            return False
+        cls._acquire(tool_id)
+        return True
+
+    @classmethod
+    def tool_lock(cls, tool_id: str) -> asyncio.Lock:
+        """Serializes processing per tool so per-tool analysis state isn't shared."""
+        lock = cls._tool_locks.get(tool_id)
+        if lock is None:
+            lock = cls._tool_locks[tool_id] = asyncio.Lock()
+        return lock
+
+    @classmethod
+    def take_pending(
+        cls, tool_id: str
+    ) -> Tuple[TelemetryData, DetectionStrategy | None] | None:
+        """Claims the coalesced sample; call while holding the tool lock."""
+        return cls._pending.pop(tool_id, None)
+
+    @classmethod
+    def _acquire(cls, tool_id: str) -> None:
+        cls._inflight[tool_id] = cls._inflight.get(tool_id, 0) + 1
+        cls._total += 1
+
+    @classmethod
+    def load_headers(cls) -> Dict[str, str]:
+        return {
+            "X-Ingest-Inflight": str(cls._total),
+            "X-Ingest-Load": f"{cls._total / MAX_INFLIGHT_TOTAL:.2f}",
+            "X-Ingest-Latency-Ms": f"{cls._latency_ewma * 1000:.0f}",
+        }
+
+    @classmethod
+    def _retry_after(cls) -> int:
+        # roughly the time needed to drain the current backlog
+        backlog = max(cls._total, 1) / MAX_INFLIGHT_TOTAL
+        return max(1, math.ceil(cls._latency_ewma * (1 + backlog)))
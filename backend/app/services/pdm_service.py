@@ -1,4 +1,3 @@
-from scipy import stats
 import numpy as np
 
 
@@ -25,9 +24,11 @@ class PdmService:
         x = np.arange(len(values))
         y = np.array(values)
 
-        # linear regression
+        # linear regression (scipy is imported lazily, it dominates cold start)
+        from scipy.stats import linregress
+
         try:
-            slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+            slope, intercept, r_value, p_value, std_err = linregress(x, y)
         except Exception:
             return None
 
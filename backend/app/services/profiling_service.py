@@ -0,0 +1,229 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List
+
+# token required on X-Admin-Token for the admin endpoints and forced profiles
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MAX_STORED_PROFILES = 50
+
+
+class Profile:
+    """Collapsed stacks captured while one unit of work ran."""
+
+    def __init__(self, label: str, interval_seconds: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.interval_seconds = interval_seconds
+        self.started_at = datetime.now(timezone.utc)
+        self.duration_seconds = 0.0
+        self.stacks: Counter = Counter()
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        return collapse_stacks(self.stacks)
+
+    @property
+    def period_seconds(self) -> float:
+        # sleeps overshoot, so use the measured sampling period rather than the nominal one
+        if self.duration_seconds and self.sample_count:
+            return self.duration_seconds / self.sample_count
+        return self.interval_seconds
+
+    def function_summary(self, top: int = 25) -> List[dict]:
+        return summarize_stacks(self.stacks, self.period_seconds, top)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_seconds * 1000, 2),
+            "samples": self.sample_count,
+        }
+
+
+def collapse_stacks(stacks: Counter) -> str:
+    """Brendan Gregg's folded format, ready for flamegraph.pl or speedscope."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.items())
+
+
+def summarize_stacks(stacks: Counter, interval_seconds: float, top: int) -> List[dict]:
+    """
+    Per-function self/total time estimated from sample counts. Stacks already
+    weighted in seconds are summarized with interval_seconds=1.
+    """
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_counts[frames[-1]] += count
+        # recursion shouldn't count a function twice in the same stack
+        for frame in set(frames):
+            total_counts[frame] += count
+
+    grand_total = sum(stacks.values()) or 1
+    return [
+        {
+            "function": frame,
+            "self_ms": round(self_counts[frame] * interval_seconds * 1000, 2),
+            "total_ms": round(total * interval_seconds * 1000, 2),
+            "total_pct": round(100 * total / grand_total, 1),
+        }
+        for frame, total in total_counts.most_common(top)
+    ]
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack from a background thread at a fixed
+    interval. The target thread isn't instrumented; each tick costs one
+    sys._current_frames() call.
+    """
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            frames.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+
+class ProfilingService:
+    """
+    Opt-in request profiling. Off by default; enabled at runtime through the
+    admin endpoints (sampled traffic) or per request via X-Profile.
+    """
+
+    enabled = False
+    sample_rate = 1.0
+    interval_ms = 5.0
+
+    _profiles: deque = deque(maxlen=MAX_STORED_PROFILES)
+    _aggregate: Dict[str, Counter] = {}
+    # seconds per stack, from each profile's measured period, so the summary
+    # stays right when interval_ms changes between profiles
+    _aggregate_seconds: Dict[str, Counter] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def is_admin(token: str | None) -> bool:
+        if not ADMIN_TOKEN or not token:
+            return False
+        return hmac.compare_digest(token, ADMIN_TOKEN)
+
+    @classmethod
+    def configure(cls, enabled: bool, sample_rate: float, interval_ms: float) -> None:
+        cls.enabled = enabled
+        cls.sample_rate = sample_rate
+        cls.interval_ms = interval_ms
+
+    @classmethod
+    def new_profile(
+        cls, label: str, force_header: str | None, admin_token: str | None
+    ) -> Profile | None:
+        """Decides whether this request gets profiled; returns its Profile if so."""
+        forced = bool(force_header) and cls.is_admin(admin_token)
+        sampled = cls.enabled and random.random() < cls.sample_rate
+        if not (forced or sampled):
+            return None
+        return Profile(label, cls.interval_ms / 1000)
+
+    @classmethod
+    @contextmanager
+    def sampling(cls, profile: Profile | None):
+        """Samples the calling thread for the duration of the block."""
+        if profile is None:
+            yield None
+            return
+
+        sampler = StackSampler(threading.get_ident(), profile.interval_seconds)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield profile
+        finally:
+            sampler.stop()
+            profile.duration_seconds = time.perf_counter() - started
+            profile.stacks = sampler.stacks
+            cls._store(profile)
+
+    @classmethod
+    def get(cls, profile_id: str) -> Profile | None:
+        with cls._lock:
+            return next((p for p in cls._profiles if p.id == profile_id), None)
+
+    @classmethod
+    def recent(cls) -> List[dict]:
+        with cls._lock:
+            return [p.to_dict() for p in reversed(cls._profiles)]
+
+    @classmethod
+    def aggregate(cls, label: str | None = None) -> Counter:
+        """Sample counts per stack, merged across profiles since the last clear."""
+        return cls._merged(cls._aggregate, label)
+
+    @classmethod
+    def aggregate_seconds(cls, label: str | None = None) -> Counter:
+        """Sampled time per stack, merged across profiles since the last clear."""
+        return cls._merged(cls._aggregate_seconds, label)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._profiles.clear()
+            cls._aggregate.clear()
+            cls._aggregate_seconds.clear()
+
+    @classmethod
+    def _merged(cls, store: Dict[str, Counter], label: str | None) -> Counter:
+        with cls._lock:
+            if label is not None:
+                return Counter(store.get(label, Counter()))
+            merged: Counter = Counter()
+            for stacks in store.values():
+                merged.update(stacks)
+            return merged
+
+    @classmethod
+    def _store(cls, profile: Profile) -> None:
+        period = profile.period_seconds
+        with cls._lock:
+            cls._profiles.append(profile)
+            cls._aggregate.setdefault(profile.label, Counter()).update(profile.stacks)
+            cls._aggregate_seconds.setdefault(profile.label, Counter()).update(
+                {stack: count * period for stack, count in profile.stacks.items()}
+            )
@@ -0,0 +1,180 @@
+import math
+from dataclasses import dataclass
+from typing import Dict
+
+RAW_MEASUREMENT = "wafer_metrics"
+
+# aim for chart-sized responses when the caller doesn't pin a resolution
+TARGET_POINTS = 500
+
+ROLLUP_STATS = {
+    "mean": "mean",
+    "min": "min",
+    "max": "max",
+    "std": "stddev",
+}
+
+
+@dataclass(frozen=True)
+class RollupTier:
+    measurement: str
+    window_seconds: int
+    every: str
+
+    @property
+    def task_name(self) -> str:
+        return f"{self.measurement}_rollup"
+
+
+RAW_TIER = RollupTier(measurement=RAW_MEASUREMENT, window_seconds=0, every="")
+
+# ordered finest -> coarsest
+ROLLUP_TIERS = [
+    RollupTier(measurement=f"{RAW_MEASUREMENT}_1m", window_seconds=60, every="1m"),
+    RollupTier(measurement=f"{RAW_MEASUREMENT}_1h", window_seconds=3600, every="1h"),
+]
+
+
+class RollupService:
+    """
+    Tier selection and Flux generation for downsampled telemetry.
+    Rollups are maintained by InfluxDB tasks that the backend registers at startup.
+    """
+
+    @staticmethod
+    def effective_resolution(
+        range_seconds: int, resolution_seconds: int | None = None
+    ) -> int:
+        """Requested window, or one that yields about TARGET_POINTS points."""
+        if resolution_seconds:
+            return int(resolution_seconds)
+        return max(1, math.ceil(range_seconds / TARGET_POINTS))
+
+    @staticmethod
+    def select_tier(
+        range_seconds: int, resolution_seconds: int | None = None
+    ) -> RollupTier:
+        """Picks the coarsest tier whose window still satisfies the requested resolution."""
+        resolution_seconds = RollupService.effective_resolution(
+            range_seconds, resolution_seconds
+        )
+        eligible = [t for t in ROLLUP_TIERS if t.window_seconds <= resolution_seconds]
+        return eligible[-1] if eligible else RAW_TIER
+
+    @staticmethod
+    def build_task_flux(tier: RollupTier, bucket: str, org: str) -> str:
+        """
+        Flux task aggregating raw samples into one tier. Every tier is computed
+        from raw data so that std stays exact rather than averaged across windows.
+        """
+        return f"""
+option task = {{name: "{tier.task_name}", every: {tier.every}, offset: 10s}}
+{RollupService._rollup_flux(tier, bucket, org, "-task.every")}"""
+
+    @staticmethod
+    def build_backfill_flux(
+        tier: RollupTier, bucket: str, org: str, backfill_seconds: int
+    ) -> str:
+        """One-off rollup of raw data that predates the tier's task."""
+        return RollupService._rollup_flux(
+            tier, bucket, org, f"-{int(backfill_seconds)}s"
+        )
+
+    @staticmethod
+    def _rollup_flux(tier: RollupTier, bucket: str, org: str, start: str) -> str:
+        writers = "\n".join(
+            f'rollup(fn: {fn}, stat: "{stat}")' for stat, fn in ROLLUP_STATS.items()
+        )
+        return f"""
+data = from(bucket: "{bucket}")
+    |> range(start: {start})
+    |> filter(fn: (r) => r["_measurement"] == "{RAW_MEASUREMENT}")
+    |> group(columns: ["tool_id", "_field"])
+
+rollup = (fn, stat) => data
+    |> aggregateWindow(every: {tier.every}, fn: fn, createEmpty: false)
+    |> keep(columns: ["_time", "_value", "_field", "tool_id"])
+    |> set(key: "stat", value: stat)
+    |> set(key: "_measurement", value: "{tier.measurement}")
+    |> to(bucket: "{bucket}", org: "{org}")
+
+{writers}
+"""
+
+    @staticmethod
+    def query_params(
+        tier: RollupTier, bucket: str, tool_id: str, metric: str
+    ) -> Dict[str, str]:
+        """
+        Caller-supplied values travel as Flux params (params.*), never as query
+        text, so a crafted tool_id can't rewrite the query.
+        """
+        return {
+            "bucket": bucket,
+            "measurement": tier.measurement,
+            "tool_id": tool_id,
+            "metric": metric,
+        }
+
+    @staticmethod
+    def build_first_flux() -> str:
+        """Timestamp of a measurement's earliest point, i.e. how far back it reaches."""
+        return """
+        from(bucket: params.bucket)
+            |> range(start: 0)
+            |> filter(fn: (r) => r["_measurement"] == params.measurement)
+            |> group()
+            |> first()
+            |> keep(columns: ["_time"])
+        """
+
+    @staticmethod
+    def build_query_flux(
+        tier: RollupTier, range_seconds: int, resolution_seconds: int | None = None
+    ) -> str:
+        """
+        Flux returning one row per window with mean/min/max/std columns. Raw data
+        is always aggregated, at resolution_seconds or about TARGET_POINTS windows.
+        """
+        header = f"""
+        from(bucket: params.bucket)
+            |> range(start: -{int(range_seconds)}s)
+            |> filter(fn: (r) => r["_measurement"] == params.measurement)
+            |> filter(fn: (r) => r["tool_id"] == params.tool_id)
+            |> filter(fn: (r) => r["_field"] == params.metric)
+        """
+
+        if tier is not RAW_TIER:
+            return (
+                header
+                + """
+            |> group(columns: ["tool_id", "_field"])
+            |> pivot(rowKey: ["_time"], columnKey: ["stat"], valueColumn: "_value")
+            |> sort(columns: ["_time"])
+        """
+            )
+
+        # raw tier: aggregate on the fly so the response never scales with raw volume
+        resolution_seconds = RollupService.effective_resolution(
+            range_seconds, resolution_seconds
+        )
+        window = f"{int(resolution_seconds)}s"
+        streams = "\n".join(
+            f"""
+        {stat}_stream = raw
+            |> aggregateWindow(every: {window}, fn: {fn}, createEmpty: false)
+            |> keep(columns: ["_time", "_value", "tool_id", "_field"])
+            |> set(key: "stat", value: "{stat}")"""
+            for stat, fn in ROLLUP_STATS.items()
+        )
+        tables = ", ".join(f"{stat}_stream" for stat in ROLLUP_STATS)
+        return f"""
+        raw = {header.strip()}
+            |> group(columns: ["tool_id", "_field"])
+        {streams}
+
+        union(tables: [{tables}])
+            |> group(columns: ["tool_id", "_field"])
+            |> pivot(rowKey: ["_time"], columnKey: ["stat"], valueColumn: "_value")
+            |> sort(columns: ["_time"])
+        """
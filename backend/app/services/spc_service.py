@@ -1,5 +1,3 @@
-import polars as pl
-
 class SPCService:
     @staticmethod
     def calculate_spc_metrics(telemetry_data: list):
@@ -10,6 +8,8 @@ class SPCService:
         if not telemetry_data:
             return []
 
+        import polars as pl
+
         # convert to Polars DataFrame for high-performance processing
         df = pl.DataFrame(telemetry_data)
         
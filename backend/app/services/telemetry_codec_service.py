@@ -0,0 +1,159 @@
+import os
+import hmac
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+import msgpack
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+
+from app.schemas.schemas import TelemetryData, MetricType
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# shared secret presented by trusted gateways in the X-Gateway-Token header
+TRUSTED_GATEWAY_TOKEN = os.getenv("TRUSTED_GATEWAY_TOKEN")
+
+_METRIC_LOOKUP = {metric.value: metric for metric in MetricType}
+
+
+class UnsupportedMediaType(Exception):
+    pass
+
+
+class TelemetryDecodeError(Exception):
+    pass
+
+
+class TelemetryCodecService:
+    """
+    Encodes and decodes telemetry on the wire (JSON or MessagePack).
+    """
+
+    @staticmethod
+    def wants_msgpack(header_value: str | None) -> bool:
+        """
+        Negotiates on the Accept header's media ranges and q-values. MessagePack
+        must be listed explicitly; ties with JSON go to MessagePack as the more
+        specific choice.
+        """
+        if not header_value:
+            return False
+
+        msgpack_q = json_q = 0.0
+        for media_range in header_value.split(","):
+            media, *params = [part.strip() for part in media_range.split(";")]
+            media = media.lower()
+            q = 1.0
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip().lower() == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+
+            if media in MSGPACK_MEDIA_TYPES:
+                msgpack_q = max(msgpack_q, q)
+            elif media in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+                json_q = max(json_q, q)
+
+        return msgpack_q > 0 and msgpack_q >= json_q
+
+    @staticmethod
+    def openapi_schema() -> dict:
+        """TelemetryData's JSON schema with $defs inlined, so it's valid inside OpenAPI."""
+        schema = TelemetryData.model_json_schema()
+        defs = schema.pop("$defs", {})
+
+        def inline(node):
+            if isinstance(node, dict):
+                ref = node.get("$ref", "")
+                if ref.startswith("#/$defs/"):
+                    return inline(defs[ref.split("/")[-1]])
+                return {key: inline(value) for key, value in node.items()}
+            if isinstance(node, list):
+                return [inline(item) for item in node]
+            return node
+
+        return inline(schema)
+
+    @staticmethod
+    def is_trusted_gateway(token: str | None) -> bool:
+        if not TRUSTED_GATEWAY_TOKEN or not token:
+            return False
+        return hmac.compare_digest(token, TRUSTED_GATEWAY_TOKEN)
+
+    @staticmethod
+    def decode(body: bytes, content_type: str | None, trusted: bool = False):
+        """
+        Parses a request body into TelemetryData.
+        Trusted gateways skip per-field Pydantic validation for either encoding.
+        """
+        content_type = (content_type or JSON_MEDIA_TYPE).split(";")[0].strip()
+
+        if content_type in MSGPACK_MEDIA_TYPES:
+            try:
+                payload = msgpack.unpackb(body, raw=False, timestamp=3)
+            except Exception as e:
+                raise TelemetryDecodeError(f"Malformed MessagePack body: {e}")
+            if trusted:
+                return TelemetryCodecService._construct_trusted(payload)
+            try:
+                return TelemetryData.model_validate(payload)
+            except ValidationError as e:
+                raise TelemetryDecodeError(str(e))
+
+        if content_type != JSON_MEDIA_TYPE:
+            raise UnsupportedMediaType(content_type)
+
+        if trusted:
+            try:
+                payload = json.loads(body)
+            except ValueError as e:
+                raise TelemetryDecodeError(f"Malformed JSON body: {e}")
+            return TelemetryCodecService._construct_trusted(payload)
+
+        try:
+            # model_validate_json parses and validates in a single pass
+            return TelemetryData.model_validate_json(body)
+        except ValidationError as e:
+            raise TelemetryDecodeError(str(e))
+
+    @staticmethod
+    def encode(content: Any) -> bytes:
+        return msgpack.packb(jsonable_encoder(content), use_bin_type=True)
+
+    @staticmethod
+    def _construct_trusted(payload: Any) -> TelemetryData:
+        """Fast path: builds the model without validation, coercing only enum keys and the timestamp."""
+        if not isinstance(payload, dict):
+            raise TelemetryDecodeError("Telemetry payload must be a map")
+
+        try:
+            metrics = {
+                _METRIC_LOOKUP[name]: float(value)
+                for name, value in payload["metrics"].items()
+                if name in _METRIC_LOOKUP
+            }
+            return TelemetryData.model_construct(
+                timestamp=TelemetryCodecService._coerce_timestamp(payload["timestamp"]),
+                tool_id=payload["tool_id"],
+                wafer_id=payload["wafer_id"],
+                metrics=metrics,
+                status=payload["status"],
+                location=payload["location"],
+                lot_id=payload.get("lot_id"),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise TelemetryDecodeError(f"Malformed trusted payload: {e!r}")
+
+    @staticmethod
+    def _coerce_timestamp(value: Any) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        return datetime.fromisoformat(value)
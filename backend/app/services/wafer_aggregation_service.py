@@ -0,0 +1,182 @@
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import WaferSummary
+from app.schemas.schemas import TelemetryData, MetricType, PredictionResponse
+from app.services.change_point_service import PROCESS_SPECS
+
+BATCH_SIZE = int(os.getenv("WAFER_SUMMARY_BATCH_SIZE", "25"))
+# cap on summaries held in memory while Postgres is unavailable
+MAX_PENDING = int(os.getenv("WAFER_SUMMARY_MAX_PENDING", "10000"))
+
+# metrics without a process spec learn their limits from this many samples, then
+# freeze them so a drifting tool can't widen its own limits
+SPC_MIN_SAMPLES = 30
+SPC_SIGMA = 3.0
+
+
+class _RunningStats:
+    """Streaming count/min/max/mean/std (Welford)."""
+
+    __slots__ = ("count", "min", "max", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.mean, 4),
+            "std": round(self.std, 4),
+        }
+
+
+class _OpenWafer:
+    def __init__(self, data: TelemetryData):
+        self.wafer_id = data.wafer_id
+        self.lot_id = data.lot_id
+        self.tool_id = data.tool_id
+        self.started_at: datetime = data.timestamp
+        self.last_at: datetime = data.timestamp
+        self.sample_count = 0
+        self.metrics: Dict[MetricType, _RunningStats] = {}
+        self.spc_violations = 0
+        self.interlock_triggered = False
+        self.rul: float | None = None
+
+    def to_mapping(self) -> dict:
+        return {
+            "wafer_id": self.wafer_id,
+            "lot_id": self.lot_id,
+            "tool_id": self.tool_id,
+            "started_at": self.started_at,
+            "completed_at": self.last_at,
+            "duration_seconds": (self.last_at - self.started_at).total_seconds(),
+            "sample_count": self.sample_count,
+            "metric_stats": {m.value: s.to_dict() for m, s in self.metrics.items()},
+            "spc_violations": self.spc_violations,
+            "interlock_triggered": self.interlock_triggered,
+            "rul_at_completion": self.rul,
+        }
+
+
+class WaferAggregationService:
+    """
+    Streams telemetry into per-wafer summaries. A wafer is closed when its tool
+    reports a different wafer_id (or interlocks), and closed summaries are
+    written to Postgres in batches.
+    """
+
+    _lock = threading.Lock()
+    _open: Dict[str, _OpenWafer] = {}
+    _tool_limits: Dict[Tuple[str, MetricType], _RunningStats] = {}
+    _pending: List[dict] = []
+
+    @classmethod
+    def observe(
+        cls, data: TelemetryData, health: PredictionResponse, interlock_active: bool
+    ) -> None:
+        with cls._lock:
+            wafer = cls._open.get(data.tool_id)
+            if wafer is not None and wafer.wafer_id != data.wafer_id:
+                cls._close(data.tool_id)
+                wafer = None
+            if wafer is None:
+                wafer = cls._open[data.tool_id] = _OpenWafer(data)
+
+            wafer.sample_count += 1
+            wafer.last_at = data.timestamp
+            wafer.rul = health.remaining_life_seconds
+
+            violation = False
+            for metric, value in data.metrics.items():
+                wafer.metrics.setdefault(metric, _RunningStats()).add(value)
+                if cls._out_of_control(data.tool_id, metric, value):
+                    violation = True
+            if violation:
+                wafer.spc_violations += 1
+
+            if interlock_active:
+                # the tool stops here, so the wafer won't see a successor
+                wafer.interlock_triggered = True
+                cls._close(data.tool_id)
+
+    @classmethod
+    def _out_of_control(cls, tool_id: str, metric: MetricType, value: float) -> bool:
+        """Judges a sample against a fixed in-control baseline (caller holds _lock)."""
+        spec = PROCESS_SPECS.get(metric)
+        if spec is not None:
+            return abs(value - spec.target) > SPC_SIGMA * spec.sigma
+
+        limits = cls._tool_limits.setdefault((tool_id, metric), _RunningStats())
+        if limits.count < SPC_MIN_SAMPLES:
+            limits.add(value)
+            return False
+        return abs(value - limits.mean) > SPC_SIGMA * limits.std
+
+    @classmethod
+    def close(cls, tool_id: str) -> None:
+        """Closes the tool's open wafer, if any (e.g. it was interrupted by an interlock)."""
+        with cls._lock:
+            if tool_id in cls._open:
+                cls._close(tool_id)
+
+    @classmethod
+    def reset_limits(cls, tool_id: str | None = None) -> None:
+        """Drops running SPC limits so drift seen before a reset isn't baked in."""
+        with cls._lock:
+            if tool_id is None:
+                cls._tool_limits.clear()
+                return
+            for key in [k for k in cls._tool_limits if k[0] == tool_id]:
+                del cls._tool_limits[key]
+
+    @classmethod
+    def flush(cls, pg_db: Session, force: bool = False) -> int:
+        """Bulk-inserts closed summaries once a full batch is ready (or when forced)."""
+        with cls._lock:
+            if not cls._pending or (len(cls._pending) < BATCH_SIZE and not force):
+                return 0
+            batch, cls._pending = cls._pending, []
+
+        try:
+            pg_db.bulk_insert_mappings(WaferSummary, batch)
+            pg_db.commit()
+        except Exception as e:
+            pg_db.rollback()
+            print(f"!!! WAFER SUMMARY FLUSH FAILED ({len(batch)} queued): {e}")
+            with cls._lock:
+                cls._pending = (batch + cls._pending)[-MAX_PENDING:]
+            return 0
+
+        return len(batch)
+
+    @classmethod
+    def _close(cls, tool_id: str) -> None:
+        wafer = cls._open.pop(tool_id)
+        cls._pending.append(wafer.to_mapping())
+        if len(cls._pending) > MAX_PENDING:
+            del cls._pending[: len(cls._pending) - MAX_PENDING]
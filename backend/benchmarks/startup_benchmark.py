@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark for the API.
+
+Measures, in fresh interpreters, how long `import app.main` takes and which
+top-level modules dominate it. No databases are required.
+
+    cd backend && python benchmarks/startup_benchmark.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def slowest_imports(module: str, top: int) -> list[tuple[int, str]]:
+    """Parses `-X importtime` output into (cumulative_us, module) pairs."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows, children = [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        # children are printed before their parent; only keep the direct
+        # children of the benchmarked module, deeper imports are already
+        # counted in their cumulative time
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                rows.extend(children)
+            children = []
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # the first run warms the filesystem and bytecode caches
+    time_import(args.module)
+    timings = [time_import(args.module) for _ in range(args.runs)]
+
+    print(f"Cold import of {args.module} ({args.runs} runs, interpreter included)")
+    print(f"  mean:   {statistics.mean(timings) * 1000:8.1f} ms")
+    print(f"  median: {statistics.median(timings) * 1000:8.1f} ms")
+    print(f"  min:    {min(timings) * 1000:8.1f} ms")
+
+    print("\nSlowest top-level imports:")
+    for cumulative_us, name in slowest_imports(args.module, args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
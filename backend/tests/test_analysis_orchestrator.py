@@ -0,0 +1,52 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.schemas.schemas import DetectionStrategy, MetricType, TelemetryData
+from app.services.analysis_orchestrator import AnalysisOrchestrator
+from app.services.change_point_service import ChangePointService
+
+T0 = datetime(2026, 1, 1)
+
+
+def sample(i, metrics):
+    return TelemetryData(
+        timestamp=T0 + timedelta(seconds=2 * i),
+        tool_id="ETCH-001",
+        wafer_id=f"WFR-{i:04d}",
+        metrics=metrics,
+        status="NOMINAL",
+        location="SITE-GREENFIELD-TX",
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_detectors():
+    ChangePointService.reset()
+    yield
+    ChangePointService.reset()
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [DetectionStrategy.CUSUM, DetectionStrategy.EWMA, DetectionStrategy.BOCPD],
+)
+def test_sample_without_temperature_does_not_raise_an_alarm(strategy):
+    rng = random.Random(0)
+    for i in range(50):
+        health = AnalysisOrchestrator.analyze_tool_health(
+            sample(i, {MetricType.TEMPERATURE: 180 + rng.gauss(0, 0.3)}), [], strategy
+        )
+        assert not health.is_drifting
+
+    health = AnalysisOrchestrator.analyze_tool_health(
+        sample(50, {MetricType.PRESSURE: 10.0}), [], strategy
+    )
+    assert not health.is_drifting and health.drift_onset is None
+
+    health = AnalysisOrchestrator.analyze_tool_health(
+        sample(51, {MetricType.TEMPERATURE: 180.1}), [], strategy
+    )
+    assert not health.is_drifting
+    assert not ChangePointService._alarms
@@ -0,0 +1,128 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.schemas.schemas import DetectionStrategy, MetricType
+from app.services.change_point_service import (
+    ALARM_CLEAR_SAMPLES,
+    BocpdDetector,
+    ChangePointService,
+    CusumDetector,
+    EwmaDetector,
+    ProcessSpec,
+)
+
+SPEC = ProcessSpec(target=180.0, sigma=0.3)
+INTERLOCK_LIMIT = 188.0
+T0 = datetime(2026, 1, 1)
+
+DETECTORS = {
+    "cusum": lambda: CusumDetector(spec=SPEC),
+    "ewma": lambda: EwmaDetector(spec=SPEC),
+    "bocpd": lambda: BocpdDetector(spec=SPEC),
+}
+
+
+def drifting_tool(seed, drift_start, rate):
+    """Same model as sim/tool_sim.py: a linear ramp with Gaussian noise."""
+    rng = random.Random(seed)
+    drift = 0.0
+    for i in range(1000):
+        if i >= drift_start:
+            drift += rate
+        yield i, SPEC.target + drift + rng.gauss(0, SPEC.sigma)
+
+
+def first_alarm(detector, samples):
+    for i, value in samples:
+        result = detector.update(value, T0 + timedelta(seconds=i))
+        if result.detected:
+            return i, result
+        if value > INTERLOCK_LIMIT:
+            return None, None
+    return None, None
+
+
+@pytest.mark.parametrize("name", DETECTORS)
+@pytest.mark.parametrize("rate", [0.05, 0.15])
+def test_detects_early_drift_well_before_interlock(name, rate):
+    # the simulator usually starts drifting within the first few samples
+    drift_start = 3
+    for seed in range(10):
+        index, result = first_alarm(
+            DETECTORS[name](), drifting_tool(seed, drift_start, rate)
+        )
+        assert index is not None, f"{name} missed the drift (seed {seed})"
+        assert index - drift_start <= 25
+        # the interlock comes at least (188 - 180) / rate samples after onset
+        assert index < drift_start + (INTERLOCK_LIMIT - SPEC.target) / rate / 2
+        assert result.onset <= T0 + timedelta(seconds=index)
+
+
+@pytest.mark.parametrize("name", DETECTORS)
+def test_false_alarms_on_stationary_data(name):
+    runs_with_alarm = 0
+    for seed in range(20):
+        rng = random.Random(seed)
+        detector = DETECTORS[name]()
+        for i in range(3000):
+            value = SPEC.target + rng.gauss(0, SPEC.sigma)
+            if detector.update(value, T0 + timedelta(seconds=i)).detected:
+                runs_with_alarm += 1
+                break
+    assert runs_with_alarm <= 2
+
+
+def test_warmup_baseline_is_robust_to_early_drift():
+    detector = CusumDetector(warmup=20)
+    rng = random.Random(0)
+    # a few samples already well off target shouldn't move the median baseline
+    for i in range(20):
+        offset = 2.0 if i >= 17 else 0.0
+        detector.update(SPEC.target + offset + rng.gauss(0, 0.3), T0)
+    assert detector.baseline.ready
+    assert detector.baseline.mean == pytest.approx(SPEC.target, abs=0.3)
+
+
+def test_alarm_clears_once_back_in_control():
+    ChangePointService.reset()
+    strategy = DetectionStrategy.CUSUM
+    rng = random.Random(1)
+
+    def feed(value, i):
+        return ChangePointService.update(
+            "TOOL-1", MetricType.TEMPERATURE, value, T0 + timedelta(seconds=i), strategy
+        )
+
+    i = 0
+    result = None
+    while result is None or not result.detected:
+        result = feed(SPEC.target + 3.0, i)
+        i += 1
+    onset = result.onset
+
+    # stays raised (with its original onset) while the process settles back
+    result = feed(SPEC.target, i)
+    assert result.detected and result.onset == onset
+
+    for i in range(i + 1, i + 1 + 4 * ALARM_CLEAR_SAMPLES):
+        result = feed(SPEC.target + rng.gauss(0, SPEC.sigma), i)
+    assert not result.detected
+    assert (
+        "TOOL-1",
+        MetricType.TEMPERATURE,
+        strategy,
+    ) not in ChangePointService._alarms
+    ChangePointService.reset()
+
+
+def test_reset_drops_only_that_tool():
+    ChangePointService.reset()
+    for tool_id in ("TOOL-1", "TOOL-2"):
+        ChangePointService.update(
+            tool_id, MetricType.TEMPERATURE, SPEC.target, T0, DetectionStrategy.EWMA
+        )
+    ChangePointService.reset("TOOL-1")
+    assert [k[0] for k in ChangePointService._detectors] == ["TOOL-2"]
+    ChangePointService.reset()
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.requests import Request
+
+import app.api.routes as routes
+from app.schemas.schemas import DetectionStrategy, MetricType, TelemetryData
+from app.services.ingest_admission_service import (
+    MAX_INFLIGHT_PER_TOOL,
+    MAX_INFLIGHT_TOTAL,
+    TARGET_LATENCY_SECONDS,
+    Admission,
+    IngestAdmissionService,
+)
+
+T0 = datetime(2026, 1, 1)
+TOOL = "ETCH-001"
+
+
+def sample(wafer_id, temp=180.0, status="NOMINAL", i=0):
+    return TelemetryData(
+        timestamp=T0 + timedelta(seconds=2 * i),
+        tool_id=TOOL,
+        wafer_id=wafer_id,
+        metrics={MetricType.TEMPERATURE: temp},
+        status=status,
+        location="SITE-GREENFIELD-TX",
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(IngestAdmissionService, "_inflight", {})
+    monkeypatch.setattr(IngestAdmissionService, "_total", 0)
+    monkeypatch.setattr(IngestAdmissionService, "_latency_ewma", 0.0)
+    monkeypatch.setattr(IngestAdmissionService, "_pending", {})
+    monkeypatch.setattr(IngestAdmissionService, "_tool_locks", {})
+
+
+def assert_idle():
+    assert IngestAdmissionService._inflight == {}
+    assert IngestAdmissionService._total == 0
+    assert IngestAdmissionService._pending == {}
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (sample("W1"), False),
+        (sample("W1", temp=186.0), True),
+        (sample("W1", status="WARNING_HIGH_TEMP"), True),
+        (sample("W1", status="CRITICAL_OVERHEAT"), True),
+        # unknown gateway statuses don't bypass admission control
+        (sample("W1", status="nominal"), False),
+        (sample("W1", status="IDLE"), False),
+    ],
+)
+def test_is_priority(data, expected):
+    assert IngestAdmissionService.is_priority(data) is expected
+
+
+def test_priority_is_never_coalesced_or_rejected(monkeypatch):
+    for i in range(MAX_INFLIGHT_PER_TOOL):
+        IngestAdmissionService.try_admit(sample(f"W{i}"))
+    monkeypatch.setattr(IngestAdmissionService, "_total", MAX_INFLIGHT_TOTAL)
+    monkeypatch.setattr(
+        IngestAdmissionService, "_latency_ewma", 10 * TARGET_LATENCY_SECONDS
+    )
+
+    routine = IngestAdmissionService.try_admit(sample("W9"))
+    hot = IngestAdmissionService.try_admit(sample("HOT", temp=189.0))
+
+    assert routine.outcome == Admission.REJECTED
+    assert hot.outcome == Admission.ADMITTED and hot.priority
+
+
+def test_routine_samples_coalesce_newest_wins():
+    for i in range(MAX_INFLIGHT_PER_TOOL):
+        assert IngestAdmissionService.try_admit(sample(f"W{i}")).outcome == (
+            Admission.ADMITTED
+        )
+    for wafer_id, strategy in (("W8", DetectionStrategy.EWMA), ("W9", None)):
+        decision = IngestAdmissionService.try_admit(sample(wafer_id), strategy)
+        assert decision.outcome == Admission.COALESCED
+    pending, strategy = IngestAdmissionService._pending[TOOL]
+    assert pending.wafer_id == "W9" and strategy is None
+
+
+def test_priority_supersedes_pending_sample():
+    for i in range(MAX_INFLIGHT_PER_TOOL):
+        IngestAdmissionService.try_admit(sample(f"W{i}"))
+    IngestAdmissionService.try_admit(sample("W9"))
+
+    decision = IngestAdmissionService.try_admit(sample("HOT", temp=189.0))
+
+    assert decision.outcome == Admission.ADMITTED
+    assert TOOL not in IngestAdmissionService._pending
+    for _ in range(MAX_INFLIGHT_PER_TOOL + 1):
+        assert not IngestAdmissionService.release(TOOL, 0.01)
+    assert_idle()
+
+
+def test_release_hands_over_only_when_nothing_is_in_flight():
+    for i in range(MAX_INFLIGHT_PER_TOOL):
+        IngestAdmissionService.try_admit(sample(f"W{i}"))
+    IngestAdmissionService.try_admit(sample("W9"), DetectionStrategy.CUSUM)
+
+    # one sample still in flight: the pending one keeps waiting
+    assert not IngestAdmissionService.release(TOOL, 0.01)
+    assert TOOL in IngestAdmissionService._pending
+
+    # last one out keeps the slot for the pending sample
+    assert IngestAdmissionService.release(TOOL, 0.01)
+    assert IngestAdmissionService._inflight == {TOOL: 1}
+    assert IngestAdmissionService._total == 1
+
+    data, strategy = IngestAdmissionService.take_pending(TOOL)
+    assert data.wafer_id == "W9" and strategy == DetectionStrategy.CUSUM
+    assert not IngestAdmissionService.release(TOOL, 0.01)
+    assert_idle()
+
+
+# --- end to end through the ingest route --- #
+
+
+def telemetry_request(data, strategy=None):
+    body = data.model_dump_json().encode()
+    query = f"strategy={strategy.value}" if strategy else ""
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/telemetry",
+        "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json")],
+    }
+    return Request(scope, receive)
+
+
+@pytest.fixture
+def slow_pipeline(monkeypatch):
+    """Records what the blocking ingest work saw, in order, and takes 50 ms per sample."""
+    processed = []
+    interlocks = []
+
+    def process(data, strategy, pg_db, interlock_active):
+        time.sleep(0.05)
+        processed.append((data.wafer_id, strategy))
+        return {"status": "processed", "wafer_id": data.wafer_id}
+
+    class _Session:
+        def close(self):
+            pass
+
+    monkeypatch.setattr(routes, "_process_telemetry", process)
+    monkeypatch.setattr(
+        routes,
+        "trigger_safety_interlock",
+        lambda data, pg_db: interlocks.append((data.wafer_id, list(processed))),
+    )
+    monkeypatch.setattr(routes, "new_postgres_session", _Session)
+    return processed, interlocks
+
+
+async def post(data, strategy=None):
+    request = telemetry_request(data, strategy)
+    response = await routes.receive_telemetry(request, strategy, pg_db=None)
+    return data.wafer_id, response.status_code
+
+
+async def settle():
+    while routes._coalesced_tasks:
+        await asyncio.gather(*routes._coalesced_tasks)
+
+
+def test_interlock_sample_is_not_starved_by_coalesced_work(slow_pipeline):
+    processed, interlocks = slow_pipeline
+
+    async def scenario():
+        tasks = []
+        for i in range(1, 12):
+            strategy = DetectionStrategy.CUSUM if i % 2 else DetectionStrategy.EWMA
+            tasks.append(asyncio.create_task(post(sample(f"W{i}", i=i), strategy)))
+            await asyncio.sleep(0.005)
+        tasks.append(asyncio.create_task(post(sample("HOT", temp=189.0, i=20))))
+        statuses = dict(await asyncio.gather(*tasks))
+        await settle()
+        return statuses
+
+    statuses = asyncio.run(scenario())
+
+    assert statuses["HOT"] == 200
+    assert [s for w, s in statuses.items() if w not in ("W1", "W2", "HOT")] == [202] * 9
+    # the interlock is recorded before it queues behind the in-flight W2
+    [(wafer_id, done_before)] = interlocks
+    assert wafer_id == "HOT" and "W2" not in [w for w, _ in done_before]
+    # in arrival order; the superseded coalesced samples never run
+    assert processed == [
+        ("W1", DetectionStrategy.CUSUM),
+        ("W2", DetectionStrategy.EWMA),
+        ("HOT", None),
+    ]
+    assert_idle()
+
+
+def test_last_releaser_runs_coalesced_sample_with_its_own_strategy(slow_pipeline):
+    processed, _ = slow_pipeline
+
+    async def scenario():
+        first = [
+            asyncio.create_task(post(sample(f"X{i}", i=i), DetectionStrategy.CUSUM))
+            for i in range(MAX_INFLIGHT_PER_TOOL)
+        ]
+        await asyncio.sleep(0.01)
+        coalesced = await post(sample("X9", i=9), DetectionStrategy.BOCPD)
+        await asyncio.gather(*first)
+        await settle()
+        return coalesced
+
+    assert asyncio.run(scenario()) == ("X9", 202)
+    assert processed[-1] == ("X9", DetectionStrategy.BOCPD)
+    assert [w for w, _ in processed] == ["X0", "X1", "X9"]
+    assert_idle()
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.database as database
+from app.services.rollup_service import RAW_TIER, ROLLUP_TIERS, RollupService
+
+MINUTE_TIER, HOUR_TIER = ROLLUP_TIERS
+SHIFT = 8 * 3600
+WEEK = 7 * 86400
+
+
+@pytest.mark.parametrize(
+    "range_seconds, resolution_seconds, expected",
+    [
+        (3600, None, RAW_TIER),
+        (SHIFT, None, RAW_TIER),
+        (SHIFT, 60, MINUTE_TIER),
+        (WEEK, None, MINUTE_TIER),
+        (30 * 86400, None, HOUR_TIER),
+        (WEEK, 30, RAW_TIER),
+    ],
+)
+def test_select_tier(range_seconds, resolution_seconds, expected):
+    assert RollupService.select_tier(range_seconds, resolution_seconds) == expected
+
+
+@pytest.mark.parametrize("range_seconds", [300, 3600, SHIFT])
+def test_raw_queries_are_always_aggregated(range_seconds):
+    flux = RollupService.build_query_flux(RAW_TIER, range_seconds)
+    window = RollupService.effective_resolution(range_seconds)
+    assert f"aggregateWindow(every: {window}s" in flux
+    assert range_seconds / window <= 500
+
+
+def test_query_values_travel_as_params():
+    flux = RollupService.build_query_flux(MINUTE_TIER, WEEK)
+    assert "params.tool_id" in flux and "params.metric" in flux
+    params = RollupService.query_params(MINUTE_TIER, "bucket", 'x") |> drop()', "t")
+    assert params["tool_id"] == 'x") |> drop()'
+
+
+@pytest.fixture
+def coverage(monkeypatch):
+    cache = {}
+    monkeypatch.setattr(database, "_tier_coverage", cache)
+    return cache
+
+
+def test_covering_tier_uses_cached_coverage(coverage):
+    now = datetime.now(timezone.utc)
+    coverage[RAW_TIER.measurement] = now - timedelta(days=30)
+    coverage[MINUTE_TIER.measurement] = now - timedelta(days=30)
+    coverage[HOUR_TIER.measurement] = now - timedelta(days=2)
+
+    # the hourly tier was registered later and doesn't reach back far enough
+    assert database._covering_tier(HOUR_TIER, WEEK) == MINUTE_TIER
+    assert database._covering_tier(HOUR_TIER, 86400) == HOUR_TIER
+
+
+def test_covering_tier_ignores_range_before_raw_data(coverage):
+    now = datetime.now(timezone.utc)
+    coverage[RAW_TIER.measurement] = now - timedelta(days=2)
+    coverage[HOUR_TIER.measurement] = now - timedelta(days=2)
+    assert database._covering_tier(HOUR_TIER, 30 * 86400) == HOUR_TIER
+
+
+def test_covering_tier_falls_back_to_raw_until_coverage_is_known(coverage):
+    assert database._covering_tier(HOUR_TIER, WEEK) is RAW_TIER
@@ -0,0 +1,112 @@
+import json
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_postgres_db
+from app.main import app
+from app.schemas.schemas import MetricType, TelemetryData
+from app.services.telemetry_codec_service import (
+    TelemetryCodecService,
+    TelemetryDecodeError,
+    UnsupportedMediaType,
+)
+
+SAMPLE = {
+    "timestamp": "2026-01-01T00:00:00",
+    "tool_id": "ETCH-001",
+    "wafer_id": "WFR-0001",
+    "lot_id": "LOT-001",
+    "metrics": {"temperature": 180.2, "pressure": 10.1},
+    "status": "NOMINAL",
+    "location": "SITE-GREENFIELD-TX",
+}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("", False),
+        ("application/json", False),
+        ("application/msgpack", True),
+        ("application/x-msgpack", True),
+        ("application/msgpack;q=0", False),
+        ("application/msgpack; q=0.0, application/json", False),
+        ("*/*", False),
+        ("application/msgpack, */*", True),
+        ("application/json;q=0.9, application/msgpack;q=0.5", False),
+        ("application/json;q=0.5, application/msgpack;q=0.9", True),
+        # ties go to the more specific MessagePack
+        ("application/json;q=0.8, application/msgpack;q=0.8", True),
+        ("*/*;q=0.8, application/msgpack;q=0.8", True),
+        ("application/msgpack;q=bogus", False),
+    ],
+)
+def test_wants_msgpack(accept, expected):
+    assert TelemetryCodecService.wants_msgpack(accept) is expected
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_decode_json_and_msgpack_agree(trusted):
+    from_json = TelemetryCodecService.decode(
+        json.dumps(SAMPLE).encode(), "application/json", trusted=trusted
+    )
+    from_msgpack = TelemetryCodecService.decode(
+        msgpack.packb(SAMPLE), "application/msgpack", trusted=trusted
+    )
+    for data in (from_json, from_msgpack):
+        assert isinstance(data, TelemetryData)
+        assert data.metrics[MetricType.TEMPERATURE] == 180.2
+        assert data.lot_id == "LOT-001"
+    assert from_json.timestamp == from_msgpack.timestamp
+
+
+def test_decode_rejects_unknown_media_type():
+    with pytest.raises(UnsupportedMediaType):
+        TelemetryCodecService.decode(b"<xml/>", "application/xml")
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"{not json", "application/json"),
+        (b"\xc1", "application/msgpack"),
+        (json.dumps({"tool_id": "ETCH-001"}).encode(), "application/json"),
+    ],
+)
+def test_decode_errors(body, content_type, trusted):
+    with pytest.raises(TelemetryDecodeError):
+        TelemetryCodecService.decode(body, content_type, trusted=trusted)
+
+
+@pytest.fixture
+def client():
+    # decoding fails before the session is used
+    app.dependency_overrides[get_postgres_db] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_telemetry_unsupported_media_type_is_415(client):
+    response = client.post(
+        "/api/v1/telemetry", content=b"<xml/>", headers={"Content-Type": "text/xml"}
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"{not json", "application/json"),
+        (json.dumps({**SAMPLE, "metrics": {"temperature": "hot"}}), "application/json"),
+        (b"\xc1", "application/msgpack"),
+    ],
+)
+def test_telemetry_malformed_body_is_422(client, body, content_type):
+    response = client.post(
+        "/api/v1/telemetry", content=body, headers={"Content-Type": content_type}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,93 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.schemas.schemas import (
+    ActionType,
+    MetricType,
+    PredictionResponse,
+    RootCauseType,
+    TelemetryData,
+)
+from app.services.wafer_aggregation_service import (
+    SPC_MIN_SAMPLES,
+    WaferAggregationService,
+)
+
+T0 = datetime(2026, 1, 1)
+INTERLOCK_LIMIT = 188.0
+HEALTH = PredictionResponse(
+    is_drifting=False,
+    root_cause=RootCauseType.NORMAL,
+    reason="Stable",
+    recommended_action=ActionType.MONITOR,
+)
+
+
+def sample(i, wafer_id, metrics, tool_id="ETCH-001"):
+    return TelemetryData(
+        timestamp=T0 + timedelta(seconds=2 * i),
+        tool_id=tool_id,
+        wafer_id=wafer_id,
+        metrics=metrics,
+        status="NOMINAL",
+        location="SITE-GREENFIELD-TX",
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    def clear():
+        WaferAggregationService._open.clear()
+        WaferAggregationService._tool_limits.clear()
+        WaferAggregationService._pending.clear()
+
+    clear()
+    yield
+    clear()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_drift_run_ending_in_interlock_records_violations(seed):
+    # the simulator's drift model: 0.1 per sample with sigma=0.3 noise
+    rng = random.Random(seed)
+    i = 0
+    while True:
+        temp = 180.0 + 0.1 * i + rng.gauss(0, 0.3)
+        interlock = temp > INTERLOCK_LIMIT
+        WaferAggregationService.observe(
+            sample(i, f"WFR-{i // 5:04d}", {MetricType.TEMPERATURE: temp}),
+            HEALTH,
+            interlock,
+        )
+        i += 1
+        if interlock:
+            break
+
+    summaries = WaferAggregationService._pending
+    assert summaries[-1]["interlock_triggered"]
+    assert summaries[-1]["spc_violations"] > 0
+    # every wafer well past +3 sigma is flagged, not just the last one
+    assert sum(s["spc_violations"] for s in summaries) >= 40
+
+
+def test_learned_limits_freeze_after_min_samples():
+    rng = random.Random(1)
+    key = ("ETCH-001", MetricType.PRESSURE)
+    for i in range(SPC_MIN_SAMPLES):
+        WaferAggregationService.observe(
+            sample(i, "WFR-0001", {MetricType.PRESSURE: 10 + rng.gauss(0, 0.1)}),
+            HEALTH,
+            False,
+        )
+    limits = WaferAggregationService._tool_limits[key]
+    mean, std = limits.mean, limits.std
+
+    for i in range(SPC_MIN_SAMPLES, SPC_MIN_SAMPLES + 20):
+        WaferAggregationService.observe(
+            sample(i, "WFR-0001", {MetricType.PRESSURE: 12.0}), HEALTH, False
+        )
+
+    assert (limits.count, limits.mean, limits.std) == (SPC_MIN_SAMPLES, mean, std)
+    assert WaferAggregationService._open["ETCH-001"].spc_violations == 20
@@ -3,8 +3,14 @@ import json
 import random
 import os
 import requests
+import msgpack
 from datetime import datetime
 
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+WAFERS_PER_LOT = 25
+SAMPLE_INTERVAL = 2
+MAX_BACKOFF = 30
+
 
 class SemiconductorEtchTool:
     def __init__(self, tool_id):
@@ -49,6 +55,7 @@ class SemiconductorEtchTool:
             "timestamp": datetime.utcnow().isoformat(),
             "tool_id": self.tool_id,
             "wafer_id": f"WFR-{self.cycle_count:04d}",
+            "lot_id": f"LOT-{(self.cycle_count - 1) // WAFERS_PER_LOT + 1:03d}",
             "metrics": {
                 "temperature": round(current_temp, 2),
                 "pressure": round(current_pressure, 2),
@@ -59,21 +66,74 @@ class SemiconductorEtchTool:
         }
 
 
+def post_telemetry(api_url, data, wire_format="json", gateway_token=None):
+    """
+    Sends one sample using the configured wire format.
+    Returns (status, body, retry_after) where retry_after is the server's
+    Retry-After hint in seconds, if any.
+    """
+    headers = {}
+    if gateway_token:
+        headers["X-Gateway-Token"] = gateway_token
+
+    if wire_format == "msgpack":
+        headers["Content-Type"] = MSGPACK_MEDIA_TYPE
+        headers["Accept"] = MSGPACK_MEDIA_TYPE
+        response = requests.post(
+            api_url, data=msgpack.packb(data), headers=headers, timeout=2
+        )
+    else:
+        response = requests.post(api_url, json=data, headers=headers, timeout=2)
+
+    retry_after = response.headers.get("Retry-After")
+    retry_after = int(retry_after) if retry_after and retry_after.isdigit() else None
+
+    if response.status_code != 200:
+        return response.status_code, None, retry_after
+    if response.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+        body = msgpack.unpackb(response.content, raw=False)
+    else:
+        body = response.json()
+    return response.status_code, body, retry_after
+
+
 if __name__ == "__main__":
     etch_tool = SemiconductorEtchTool(tool_id="ETCH-001")
     api_url = os.getenv("API_URL", "http://backend:8000/telemetry")
+    wire_format = os.getenv("WIRE_FORMAT", "json").lower()
+    gateway_token = os.getenv("GATEWAY_TOKEN")
+    # optional JSONL capture of every sample, replayable with app.profile_replay
+    record_path = os.getenv("RECORD_PATH")
+    record_file = open(record_path, "a") if record_path else None
 
-    print(f"--- [MISSION START] Digital Twin Stream: {etch_tool.tool_id} ---")
+    print(
+        f"--- [MISSION START] Digital Twin Stream: {etch_tool.tool_id} ({wire_format}) ---"
+    )
+
+    backoff = SAMPLE_INTERVAL
 
     try:
         while etch_tool.is_running:
             data = etch_tool.generate_telemetry()
+            delay = SAMPLE_INTERVAL
+            if record_file:
+                record_file.write(json.dumps(data) + "\n")
+                record_file.flush()
 
             try:
-                response = requests.post(api_url, json=data, timeout=2)
-
-                if response.status_code == 200:
-                    result = response.json()
+                status_code, result, retry_after = post_telemetry(
+                    api_url, data, wire_format, gateway_token
+                )
+
+                if status_code == 429:
+                    # routine sample shed by the backend: honor its pacing
+                    delay = max(SAMPLE_INTERVAL, retry_after or backoff)
+                    print(f"Backend overloaded, sample shed. Pausing {delay}s.")
+                elif status_code == 202:
+                    backoff = SAMPLE_INTERVAL
+                    print(f"Wafer {data['wafer_id']} | coalesced by backend (busy)")
+                elif status_code == 200:
+                    backoff = SAMPLE_INTERVAL
                     current_val = data["metrics"]["temperature"]
 
                     if result.get("interlock_active"):
@@ -92,12 +152,20 @@ if __name__ == "__main__":
                             f"Wafer {data['wafer_id']} | {current_val}°C | Status: {data['status']} {drift_info}"
                         )
 
+            except requests.exceptions.Timeout:
+                # slow backend: back off instead of piling requests onto it
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                delay = backoff
+                print(f"Warning: Backend slow to respond. Backing off {delay}s.")
             except requests.exceptions.ConnectionError:
                 print("Error: Backend Nervous System unreachable. Retrying...")
 
-            time.sleep(2)
+            time.sleep(delay)
 
         print("--- [MISSION END] Tool in Safe State. ---")
 
     except KeyboardInterrupt:
         print("\nManual override detected. Stopping stream.")
+    finally:
+        if record_file:
+            record_file.close()